@@ -1,6 +1,7 @@
 import streamlit as st
 import requests
 import json
+import time
 import pandas as pd
 
 # --- Configuration ---
@@ -8,7 +9,10 @@ import pandas as pd
 BASE_URL = "https://smart-resume-screener-u2zt.onrender.com"
 
 API_URL = f"{BASE_URL}/analyze"
-TALENT_POOL_URL = f"{BASE_URL}/resumes"
+JOBS_URL = f"{BASE_URL}/jobs"
+TALENT_POOL_SYNC_URL = f"{BASE_URL}/resumes/sync"
+EXPORT_URL = f"{BASE_URL}/export"
+ROLE_MATCH_URL = f"{BASE_URL}/analyze/roles"
 
 
 # --- Predefined Job Data ---
@@ -33,19 +37,55 @@ jobs = [
 ]
 
 # --- API Communication Function ---
-def call_analysis_api(job_description, resume_file):
+# Resumes are uploaded in chunks so large selections don't become one huge request
+BATCH_SIZE = 20
+# Finished jobs are collected by polling; each poll is a short request
+JOB_POLL_SECONDS = 1.0
+JOB_POLL_MAX_IDS = 200
+JOB_WAIT_TIMEOUT = 900
+
+def submit_analysis_jobs(job_description, resume_files):
+    """
+    Queues resumes for background analysis and returns the list of created jobs.
+    """
     try:
-        files = {'resume': (resume_file.name, resume_file.getvalue(), resume_file.type)}
+        files = [('resumes', (f.name, f.getvalue(), f.type)) for f in resume_files]
         data = {'job_description': job_description}
-        response = requests.post(API_URL, files=files, data=data, timeout=90)
-        if response.status_code == 200:
-            return response.json()
+        response = requests.post(API_URL, params={'async': 'true'}, files=files, data=data, timeout=60)
+        if response.status_code == 202:
+            return response.json().get("jobs", [])
         else:
             st.error(f"Error from API: {response.status_code} - {response.text}")
-            return None
+            return []
     except requests.exceptions.RequestException as e:
         st.error(f"Connection Error: Could not connect to the backend API. It might be starting up. Please wait and try again. Error: {e}")
-        return None
+        return []
+
+def poll_job_results(job_ids):
+    """
+    Yields finished jobs as they complete by polling the job status endpoint.
+    Each poll is a short request, so no backend worker is held while waiting.
+    """
+    pending = list(job_ids)
+    deadline = time.time() + JOB_WAIT_TIMEOUT
+    while pending and time.time() < deadline:
+        try:
+            response = requests.get(JOBS_URL, params={'ids': ",".join(str(job_id) for job_id in pending[:JOB_POLL_MAX_IDS])}, timeout=30)
+        except requests.exceptions.RequestException as e:
+            st.error(f"Connection Error: Lost connection while waiting for results. Error: {e}")
+            return
+        if response.status_code != 200:
+            st.error(f"Error from API: {response.status_code} - {response.text}")
+            return
+        finished = [job for job in response.json().get("jobs", []) if job["status"] in ("done", "failed")]
+        for job in finished:
+            yield job
+        finished_ids = {job["job_id"] for job in finished}
+        pending = [job_id for job_id in pending if job_id not in finished_ids]
+        if pending:
+            time.sleep(JOB_POLL_SECONDS)
+    if pending:
+        st.warning(f"{len(pending)} resumes are still being analyzed. Their results will appear in the Talent Pool once finished.")
 
 # --- NEW: RELIABLE CALLBACK FUNCTION ---
 def apply_template():
@@ -57,11 +97,51 @@ def apply_template():
     selected_role = st.session_state.role_select # Read the value from the selectbox's key
     selected_job_details = next((job for job in jobs if job['role'] == selected_role), None)
     if selected_job_details:
-        jd_text = (f"**Role:** {selected_job_details['role']}\n\n"
-                   f"**Description:** {selected_job_details['description']}\n\n"
-                   f"**Key Skills:**\n- " + "\n- ".join(selected_job_details['skills']))
         # Update the session state, which will automatically update the text_area
-        st.session_state.job_description = jd_text
+        st.session_state.job_description = build_job_description(selected_job_details)
+
+def build_job_description(job):
+    return (f"**Role:** {job['role']}\n\n"
+            f"**Description:** {job['description']}\n\n"
+            f"**Key Skills:**\n- " + "\n- ".join(job['skills']))
+
+def call_role_match_api(resume_file, selected_jobs, top_k):
+    """
+    Scores one resume against several roles from the catalog in a single request.
+    """
+    try:
+        roles = [{"title": job['role'], "description": build_job_description(job)} for job in selected_jobs]
+        files = {'resume': (resume_file.name, resume_file.getvalue(), resume_file.type)}
+        data = {'roles': json.dumps(roles), 'top_k': top_k}
+        response = requests.post(ROLE_MATCH_URL, files=files, data=data, timeout=120)
+        if response.status_code == 200:
+            return response.json()
+        else:
+            st.error(f"Error from API: {response.status_code} - {response.text}")
+            return None
+    except requests.exceptions.RequestException as e:
+        st.error(f"Connection Error: Could not connect to the backend API. It might be starting up. Please wait and try again. Error: {e}")
+        return None
+
+def render_result_card(result):
+    score = result.get('score', 0)
+    if score >= 85: badge_color = "#28a745"
+    elif score >= 70: badge_color = "#ffc107"
+    else: badge_color = "#dc3545"
+
+    st.markdown(f'<div class="result-card">', unsafe_allow_html=True)
+    col1, col2 = st.columns([1, 4])
+    with col1:
+        st.markdown(f'<h5>{result["file_name"]}</h5>', unsafe_allow_html=True)
+        st.markdown(f'<div class="score-badge" style="background-color:{badge_color};">{score}%</div>', unsafe_allow_html=True)
+    with col2:
+        with st.expander("**View Detailed Analysis**", expanded=(score >= 85)):
+            st.info(result['summary'])
+            if result.get('skills'): st.success(f"**Skills:** {', '.join(result['skills'])}")
+            if result.get('experience'): st.write(f"**Experience:** {result['experience']}")
+            if result.get('education'): st.write(f"**Education:** {result['education']}")
+            if result.get('missing'): st.warning("**Missing from Resume:**\n" + "\n".join(f"- {k}" for k in result['missing']))
+    st.markdown('</div>', unsafe_allow_html=True)
 
 # --- Streamlit App UI ---
 st.set_page_config(page_title="Smart Resume Screener", page_icon="📄", layout="wide")
@@ -83,7 +163,7 @@ st.markdown("""
 # --- Main Application Logic ---
 st.title("Smart Resume Screener")
 
-tab1, tab2 = st.tabs(["Analyze New Resumes", "View Talent Pool (Database)"])
+tab1, tab2, tab3 = st.tabs(["Analyze New Resumes", "View Talent Pool (Database)", "Match Candidate to Roles"])
 
 with tab1:
     st.header("📄 Analyze New Resumes")
@@ -139,23 +219,37 @@ with tab1:
         total_files = len(uploaded_files)
         progress_bar = st.progress(0, text="Starting analysis...")
 
-        for i, uploaded_file in enumerate(uploaded_files):
-            file_name = uploaded_file.name
-            progress_text = f"Contacting API for {file_name} ({i+1}/{total_files})..."
-            progress_bar.progress((i + 1) / total_files, text=progress_text)
-
-            with st.spinner(progress_text):
-                analysis = call_analysis_api(job_description, uploaded_file)
-                if analysis:
-                    st.session_state.results.append({
-                        "file_name": file_name,
-                        "score": analysis.get("match_score", 0),
-                        "summary": analysis.get("justification", "No summary provided."),
-                        "skills": analysis.get("extracted_skills", []),
-                        "experience": analysis.get("extracted_experience", "Not found."),
-                        "education": analysis.get("extracted_education", "Not found."),
-                        "missing": analysis.get("missing_keywords", [])
-                    })
+        submitted_jobs = []
+        for start in range(0, total_files, BATCH_SIZE):
+            batch = uploaded_files[start:start + BATCH_SIZE]
+            progress_bar.progress(0, text=f"Uploading resumes {start+1}-{start+len(batch)} of {total_files}...")
+            submitted_jobs.extend(submit_analysis_jobs(job_description, batch))
+
+        # Render each candidate as soon as their analysis finishes
+        live_results = st.empty()
+        live_container = live_results.container()
+        finished = 0
+        job_ids = [j["job_id"] for j in submitted_jobs]
+        for job in (poll_job_results(job_ids) if job_ids else []):
+            finished += 1
+            progress_bar.progress(finished / len(submitted_jobs), text=f"Analyzed {finished} of {len(submitted_jobs)} resumes...")
+            analysis = job.get("analysis")
+            if not analysis:
+                live_container.error(f"{job.get('filename')}: {job.get('error', 'Analysis failed.')}")
+                continue
+            result = {
+                "file_name": job.get("filename"),
+                "score": analysis.get("match_score", 0),
+                "summary": analysis.get("justification", "No summary provided."),
+                "skills": analysis.get("extracted_skills", []),
+                "experience": analysis.get("extracted_experience", "Not found."),
+                "education": analysis.get("extracted_education", "Not found."),
+                "missing": analysis.get("missing_keywords", [])
+            }
+            st.session_state.results.append(result)
+            with live_container:
+                render_result_card(result)
+        live_results.empty()
         progress_bar.empty()
 
     # --- Display Logic ---
@@ -171,24 +265,7 @@ with tab1:
             st.subheader("Detailed Analysis")
             
             for result in shortlisted_candidates:
-                score = result.get('score', 0)
-                if score >= 85: badge_color = "#28a745"
-                elif score >= 70: badge_color = "#ffc107"
-                else: badge_color = "#dc3545"
-
-                st.markdown(f'<div class="result-card">', unsafe_allow_html=True)
-                col1, col2 = st.columns([1, 4])
-                with col1:
-                    st.markdown(f'<h5>{result["file_name"]}</h5>', unsafe_allow_html=True)
-                    st.markdown(f'<div class="score-badge" style="background-color:{badge_color};">{score}%</div>', unsafe_allow_html=True)
-                with col2:
-                    with st.expander("**View Detailed Analysis**", expanded=(score >= 85)):
-                        st.info(result['summary'])
-                        if result.get('skills'): st.success(f"**Skills:** {', '.join(result['skills'])}")
-                        if result.get('experience'): st.write(f"**Experience:** {result['experience']}")
-                        if result.get('education'): st.write(f"**Education:** {result['education']}")
-                        if result.get('missing'): st.warning("**Missing from Resume:**\n" + "\n".join(f"- {k}" for k in result['missing']))
-                st.markdown('</div>', unsafe_allow_html=True)
+                render_result_card(result)
         
         elif st.session_state.results:
             st.warning(f"No candidates meet the score threshold of {st.session_state.shortlist_threshold}%. Try a lower score.")
@@ -201,20 +278,107 @@ with tab2:
     st.header("🗂️ View Talent Pool (from Database)")
     st.write("This section shows all resumes that have been previously analyzed and stored in the database.")
     
-    if st.button("Refresh Data from Database"):
-        try:
-            response = requests.get(TALENT_POOL_URL, timeout=30)
-            if response.status_code == 200:
-                data = response.json()
-                st.session_state.talent_pool_data = data
-                st.success(f"Successfully loaded {len(data)} records from the database!")
-            else:
+    # Only the columns shown in the table are requested from the API
+    TALENT_POOL_FIELDS = ['filename', 'match_score', 'prescreened', 'analysis_date', 'justification', 'extracted_skills', 'missing_keywords']
+    TALENT_POOL_SYNC_LIMIT = 1000
+
+    filter_col1, filter_col2, filter_col3 = st.columns(3)
+    with filter_col1:
+        pool_min_score = st.number_input("Minimum score", min_value=0, max_value=100, value=0, key="pool_min_score")
+    with filter_col2:
+        pool_filename = st.text_input("Filename contains", key="pool_filename")
+    with filter_col3:
+        pool_skill = st.text_input("Has skill", key="pool_skill")
+    pool_include_prescreened = st.checkbox(
+        "Include pre-screened candidates (scored by quick skill match, not the LLM)", value=True, key="pool_include_prescreened"
+    )
+
+    def sync_talent_pool():
+        """Fetches only the analyses added since the last sync and appends them to the session cache."""
+        new_rows = []
+        last_id = st.session_state.get('talent_pool_last_id', 0)
+        has_more = True
+        while has_more:
+            params = {'since_id': last_id, 'limit': TALENT_POOL_SYNC_LIMIT, 'fields': ",".join(TALENT_POOL_FIELDS)}
+            try:
+                response = requests.get(TALENT_POOL_SYNC_URL, params=params, timeout=30)
+            except requests.exceptions.RequestException:
+                st.error("Connection Error: Could not connect to the backend API. Is it running?")
+                break
+            if response.status_code != 200:
                 st.error(f"Failed to fetch data from API: {response.status_code}")
-        except requests.exceptions.RequestException:
-            st.error("Connection Error: Could not connect to the backend API. Is it running?")
+                break
+            page = response.json()
+            new_rows.extend(page["items"])
+            last_id = page["last_id"]
+            has_more = page["has_more"]
+
+        if new_rows:
+            cached = st.session_state.get('talent_pool_df')
+            new_df = pd.DataFrame(new_rows)
+            # List columns arrive as the JSON text stored in the database
+            for column in ('extracted_skills', 'missing_keywords'):
+                new_df[column] = new_df[column].apply(lambda value: json.loads(value) if value else [])
+            st.session_state.talent_pool_df = new_df if cached is None else pd.concat([cached, new_df], ignore_index=True)
+        st.session_state.talent_pool_last_id = last_id
+        return len(new_rows)
+
+    if st.button("Refresh Data from Database"):
+        added = sync_talent_pool()
+        st.success(f"Loaded {added} new records from the database.")
 
-    if 'talent_pool_data' in st.session_state and st.session_state.talent_pool_data:
-        df = pd.DataFrame(st.session_state.talent_pool_data)
-        st.dataframe(df[['filename', 'match_score', 'analysis_date', 'justification', 'extracted_skills', 'missing_keywords']])
+    df = st.session_state.get('talent_pool_df')
+    if df is not None and not df.empty:
+        view = df.sort_values('id', ascending=False)
+        if not pool_include_prescreened:
+            view = view[view['prescreened'] == 0]
+        if pool_min_score:
+            view = view[view['match_score'] >= pool_min_score]
+        if pool_filename.strip():
+            view = view[view['filename'].str.contains(pool_filename.strip(), case=False, regex=False)]
+        if pool_skill.strip():
+            wanted = pool_skill.strip().lower()
+            view = view[view['extracted_skills'].apply(lambda skills: any(s.lower() == wanted for s in skills or []))]
+        st.dataframe(view[TALENT_POOL_FIELDS])
+        st.caption(f"Showing {len(view)} of {len(df)} cached records. Refresh fetches only newly analyzed resumes.")
+        st.markdown(
+            f"Export for analytics: [CSV]({EXPORT_URL}?format=csv) · "
+            f"[Columnar JSON]({EXPORT_URL}?format=columnar) · "
+            f"[Skills (one row per skill)]({EXPORT_URL}?format=csv&explode=skills)"
+        )
     else:
-        st.info("Click the 'Refresh' button to load analyzed candidates from the database.")
\ No newline at end of file
+        st.info("Click the 'Refresh' button to load analyzed candidates from the database.")
+
+# --- Role Matching Tab ---
+with tab3:
+    st.header("🎯 Match a Candidate to Open Roles")
+    st.write("Upload one resume to see which roles from the catalog it fits best. Only the strongest roles by skill overlap are scored in detail.")
+
+    all_roles = [job['role'] for job in jobs]
+    match_roles = st.multiselect("Roles to consider", all_roles, default=all_roles, key="match_roles")
+    match_top_k = st.slider("Roles to score in detail", min_value=1, max_value=10, value=5, key="match_top_k")
+    match_file = st.file_uploader("Upload a Resume (PDF only)", type=["pdf"], key="match_file")
+
+    if st.button("Find Best Roles"):
+        if not match_file:
+            st.error("❌ Please upload a resume before matching.")
+        elif not match_roles:
+            st.error("❌ Please select at least one role.")
+        else:
+            selected_jobs = [job for job in jobs if job['role'] in match_roles]
+            with st.spinner(f"Matching {match_file.name} against {len(selected_jobs)} roles..."):
+                st.session_state.role_matches = call_role_match_api(match_file, selected_jobs, match_top_k)
+
+    if st.session_state.get('role_matches'):
+        rows = []
+        for role in st.session_state.role_matches.get("roles", []):
+            analysis = role.get("analysis", {})
+            rows.append({
+                "Role": role.get("title"),
+                "LLM Score": analysis.get("match_score"),
+                "Skill Coverage (%)": role.get("skill_coverage"),
+                "Scored By": "Quick skill match" if role.get("prescreened") else "LLM",
+                "Justification": analysis.get("justification", role.get("error", "")),
+                "Missing Skills": ", ".join(analysis.get("missing_keywords", [])),
+            })
+        st.dataframe(pd.DataFrame(rows), hide_index=True)
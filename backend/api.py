@@ -1,38 +1,343 @@
 import os
 import json
 import sqlite3
-from flask import Flask, request, jsonify
+import hashlib
+import math
+import re
+import base64
+import csv
+import io
+import zlib
+import threading
+import itertools
+import multiprocessing
+import time
+import uuid
+import queue
+import random
+import textwrap
+import contextvars
+import ast
+from collections import OrderedDict, Counter
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from flask import Flask, request, jsonify, Response, g
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 import PyPDF2
 from io import BytesIO
 from datetime import datetime
+from contextlib import contextmanager
 from dotenv import load_dotenv
 
 # --- Configuration ---
 load_dotenv() 
 
-try:
-    API_KEY = os.environ.get("GOOGLE_API_KEY")
-    if not API_KEY:
-        raise ValueError("GOOGLE_API_KEY not found in .env file or environment variables.")
-    genai.configure(api_key=API_KEY)
-except ValueError as e:
-    print(f"Configuration Error: {e}")
-    exit()
+# LLM backend: 'gemini' (default) or 'fake', a deterministic local stand-in for load testing
+LLM_PROVIDER = os.environ.get("LLM_PROVIDER", "gemini").lower()
+
+if LLM_PROVIDER == "gemini":
+    try:
+        API_KEY = os.environ.get("GOOGLE_API_KEY")
+        if not API_KEY:
+            raise ValueError("GOOGLE_API_KEY not found in .env file or environment variables.")
+        genai.configure(api_key=API_KEY)
+    except ValueError as e:
+        print(f"Configuration Error: {e}")
+        exit()
 
 app = Flask(__name__)
 DATABASE = 'resumes.db'
+DEFAULT_MODELS = {"gemini": "models/gemini-2.5-flash", "fake": "fake-analyzer"}
+MODEL_NAME = os.environ.get("LLM_MODEL", DEFAULT_MODELS.get(LLM_PROVIDER, ""))
+
+# Fake LLM provider settings
+FAKE_LLM_LATENCY_MS = float(os.environ.get("FAKE_LLM_LATENCY_MS", 200))
+FAKE_LLM_JITTER_MS = float(os.environ.get("FAKE_LLM_JITTER_MS", 50))
+FAKE_LLM_FAILURE_RATE = float(os.environ.get("FAKE_LLM_FAILURE_RATE", 0.0))
+FAKE_LLM_SEED = int(os.environ.get("FAKE_LLM_SEED", 0))
+
+# Analysis cache settings (in-process LRU layer in front of the SQLite cache table)
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", 512))
+CACHE_TTL_SECONDS = int(os.environ.get("CACHE_TTL_SECONDS", 7 * 24 * 3600))
+CACHE_DB_MAX_ENTRIES = int(os.environ.get("CACHE_DB_MAX_ENTRIES", 50000))
+CACHE_PRUNE_EVERY = 100
+
+# Batch analysis settings
+BATCH_MAX_FILES = int(os.environ.get("BATCH_MAX_FILES", 200))
+PDF_PARSE_WORKERS = int(os.environ.get("PDF_PARSE_WORKERS", 4))
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", 8))
+
+# Background job queue settings
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 4))
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", 0.5))
+JOB_STALE_SECONDS = int(os.environ.get("JOB_STALE_SECONDS", 600))
+JOB_STREAM_TIMEOUT = int(os.environ.get("JOB_STREAM_TIMEOUT", 900))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", 5))
+JOB_STALE_CHECK_INTERVAL = int(os.environ.get("JOB_STALE_CHECK_INTERVAL", 60))
+
+# PDF extraction settings
+PDF_MAX_PAGES = int(os.environ.get("PDF_MAX_PAGES", 50))
+PDF_MAX_CHARS = int(os.environ.get("PDF_MAX_CHARS", 100000))
+PDF_PROCESS_WORKERS = int(os.environ.get("PDF_PROCESS_WORKERS", os.cpu_count() or 1))
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get("PDF_PARALLEL_MIN_PAGES", 8))
+PDF_CACHE_TTL_SECONDS = int(os.environ.get("PDF_CACHE_TTL_SECONDS", 30 * 24 * 3600))
+PDF_CACHE_MAX_ENTRIES = int(os.environ.get("PDF_CACHE_MAX_ENTRIES", 5000))
+PDF_CACHE_PRUNE_EVERY = 100
+
+# Local pre-screening settings. Resumes whose job-skill coverage (0-100) is below
+# PRESCREEN_MIN_SCORE skip the LLM (the default 0 sends every resume); in batches
+# only the PRESCREEN_TOP_K best (0 = no limit) are sent. PRESCREEN_MODE is
+# 'heuristic' or 'drop'.
+PRESCREEN_MIN_SCORE = int(os.environ.get("PRESCREEN_MIN_SCORE", 0))
+PRESCREEN_TOP_K = int(os.environ.get("PRESCREEN_TOP_K", 0))
+PRESCREEN_MODE = os.environ.get("PRESCREEN_MODE", "heuristic")
+
+# Multi-role matching: at most this many roles per resume are scored by the LLM
+MULTI_MATCH_MAX_ROLES = int(os.environ.get("MULTI_MATCH_MAX_ROLES", 50))
+MULTI_MATCH_TOP_K = int(os.environ.get("MULTI_MATCH_TOP_K", 5))
+
+# Talent pool pagination
+RESUMES_DEFAULT_LIMIT = 50
+RESUMES_MAX_LIMIT = 500
+SEARCH_MAX_LIMIT = 200
+SYNC_DEFAULT_LIMIT = 1000
+SYNC_MAX_LIMIT = 5000
+EXPORT_CHUNK_ROWS = int(os.environ.get("EXPORT_CHUNK_ROWS", 1000))
+
+# SQLite connection pool settings (one pool per gunicorn worker process)
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 8))
+DB_BUSY_TIMEOUT_MS = int(os.environ.get("DB_BUSY_TIMEOUT_MS", 5000))
+DB_CACHE_SIZE_KB = int(os.environ.get("DB_CACHE_SIZE_KB", 20000))
+DB_MMAP_SIZE = int(os.environ.get("DB_MMAP_SIZE", 64 * 1024 * 1024))
+
+# Resilient LLM call layer. A rate of 0 disables the rate limiter.
+LLM_RATE_LIMIT_RPM = float(os.environ.get("LLM_RATE_LIMIT_RPM", 60))
+LLM_RATE_LIMIT_BURST = int(os.environ.get("LLM_RATE_LIMIT_BURST", 10))
+LLM_MAX_IN_FLIGHT = int(os.environ.get("LLM_MAX_IN_FLIGHT", 8))
+LLM_ACQUIRE_TIMEOUT = float(os.environ.get("LLM_ACQUIRE_TIMEOUT", 30))
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", 3))
+LLM_BACKOFF_BASE = float(os.environ.get("LLM_BACKOFF_BASE", 0.5))
+LLM_BACKOFF_MAX = float(os.environ.get("LLM_BACKOFF_MAX", 8.0))
+LLM_BREAKER_FAILURES = int(os.environ.get("LLM_BREAKER_FAILURES", 5))
+LLM_BREAKER_RESET_SECONDS = float(os.environ.get("LLM_BREAKER_RESET_SECONDS", 30))
+
+# Prompt token budgets (estimated at ~4 characters per token)
+PROMPT_RESUME_TOKEN_BUDGET = int(os.environ.get("PROMPT_RESUME_TOKEN_BUDGET", 4000))
+PROMPT_JD_TOKEN_BUDGET = int(os.environ.get("PROMPT_JD_TOKEN_BUDGET", 1500))
+
+# Attach a Server-Timing header with the per-stage breakdown to every response
+METRICS_TIMING_HEADERS = os.environ.get("METRICS_TIMING_HEADERS", "true").lower() in ("1", "true", "yes")
+
+# --- Metrics ---
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class Metric:
+    """
+    Minimal thread-safe Prometheus metric with labels, rendered in the text
+    exposition format by render_metrics().
+    """
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        METRICS_REGISTRY.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _format_labels(self, key, extra=()):
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        escaped = [(k, v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for k, v in pairs]
+        return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+class CounterMetric(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            return [f"{self.name}{self._format_labels(k)} {v}" for k, v in sorted(self._values.items())]
+
+class HistogramMetric(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total, observations = self._values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value, observations + 1)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for key, (counts, total, observations) in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, counts):
+                    lines.append(f"{self.name}_bucket{self._format_labels(key, [('le', repr(bound))])} {count}")
+                lines.append(f"{self.name}_bucket{self._format_labels(key, [('le', '+Inf')])} {observations}")
+                lines.append(f"{self.name}_sum{self._format_labels(key)} {total}")
+                lines.append(f"{self.name}_count{self._format_labels(key)} {observations}")
+        return lines
+
+METRICS_REGISTRY = []
+
+STAGE_DURATION = HistogramMetric(
+    "smartresume_stage_duration_seconds", "Time spent in each pipeline stage.", ["stage"])
+REQUEST_DURATION = HistogramMetric(
+    "smartresume_http_request_duration_seconds", "HTTP request latency.", ["endpoint", "method", "status"])
+LLM_FAILURES = CounterMetric(
+    "smartresume_llm_failures_total", "LLM calls that raised an error.", ["provider", "kind"])
+JSON_PARSE_FAILURES = CounterMetric(
+    "smartresume_llm_json_parse_failures_total", "LLM responses that were not valid JSON.", ["provider"])
+CACHE_LOOKUPS = CounterMetric(
+    "smartresume_cache_lookups_total", "Cache lookups by cache and result.", ["cache", "result"])
+LLM_TOKENS = CounterMetric(
+    "smartresume_llm_tokens_total", "LLM token usage.", ["provider", "kind"])
+LLM_RETRIES = CounterMetric(
+    "smartresume_llm_retries_total", "LLM calls retried after a failure.", ["provider"])
+LLM_REJECTIONS = CounterMetric(
+    "smartresume_llm_rejections_total", "LLM calls refused without reaching the provider.", ["reason"])
+JSON_REPAIRS = CounterMetric(
+    "smartresume_llm_json_repairs_total", "Malformed LLM responses recovered by repair.", ["provider"])
+PROMPT_TOKENS_SAVED = CounterMetric(
+    "smartresume_prompt_tokens_saved_total", "Estimated prompt tokens removed by compaction.")
+
+def render_metrics():
+    lines = []
+    for metric in METRICS_REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# Per-request stage timings for the Server-Timing header. A context variable rather
+# than flask.g, so worker threads started with map_in_context still report into it.
+_request_stage_timings = contextvars.ContextVar('request_stage_timings', default=None)
+_stage_timings_lock = threading.Lock()
+
+@contextmanager
+def timed_stage(stage):
+    """
+    Records the duration of the enclosed block in the stage histogram and, when
+    running on behalf of a request, in that request's Server-Timing breakdown.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_DURATION.observe(elapsed, stage=stage)
+        timings = _request_stage_timings.get()
+        if timings is not None:
+            with _stage_timings_lock:
+                timings[stage] = timings.get(stage, 0.0) + elapsed
+
+def map_in_context(pool, fn, *iterables):
+    """
+    Like pool.map, but each call runs in a copy of the caller's context so that
+    stage timings recorded in the pool threads are added to the current request.
+    """
+    futures = [pool.submit(contextvars.copy_context().run, fn, *args) for args in zip(*iterables)]
+    return [future.result() for future in futures]
 
 # --- Database Functions ---
+def sqlite_supports_fts5():
+    try:
+        conn = sqlite3.connect(':memory:')
+        conn.execute("CREATE VIRTUAL TABLE probe USING fts5(text)")
+        conn.close()
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+FTS5_AVAILABLE = sqlite_supports_fts5()
+
+class PooledConnection(sqlite3.Connection):
+    """
+    sqlite3 connection whose close() hands it back to its pool instead of
+    closing it, so callers keep the usual open/close pattern.
+    """
+    pool = None
+
+    def close(self):
+        if self.pool is None or not self.pool.release(self):
+            super().close()
+
+class ConnectionPool:
+    """
+    Per-process pool of SQLite connections configured for WAL journaling.
+    Connections keep their prepared-statement cache between checkouts.
+    """
+    def __init__(self, database, max_size=DB_POOL_SIZE):
+        self.database = database
+        self.max_size = max_size
+        self.pid = os.getpid()
+        self._idle = queue.LifoQueue(maxsize=max_size)
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.database,
+            factory=PooledConnection,
+            check_same_thread=False,
+            cached_statements=256,
+            timeout=DB_BUSY_TIMEOUT_MS / 1000,
+        )
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}")
+        conn.execute(f"PRAGMA cache_size = -{DB_CACHE_SIZE_KB}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute(f"PRAGMA mmap_size = {DB_MMAP_SIZE}")
+        conn.pool = self
+        return conn
+
+    def acquire(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.isolation_level = ''
+            self._idle.put_nowait(conn)
+            return True
+        except (queue.Full, sqlite3.Error):
+            return False
+
+_db_pool = None
+_db_pool_lock = threading.Lock()
+
 def get_db_connection():
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
-    return conn
+    global _db_pool
+    with _db_pool_lock:
+        # A forked gunicorn worker must not reuse its parent's connections
+        if _db_pool is None or _db_pool.pid != os.getpid() or _db_pool.database != DATABASE:
+            _db_pool = ConnectionPool(DATABASE)
+        pool = _db_pool
+    return pool.acquire()
 
-def init_db():
-    # This version is safer for production servers like Render
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def migrate_initial_schema(cursor):
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS analyses (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -47,29 +352,699 @@ def init_db():
             analysis_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
     ''')
-    conn.commit()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS analysis_cache (
+            cache_key TEXT PRIMARY KEY,
+            model TEXT NOT NULL,
+            result TEXT NOT NULL,
+            created_at REAL NOT NULL
+        );
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            batch_id TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            job_description TEXT NOT NULL,
+            payload BLOB,
+            status TEXT NOT NULL DEFAULT 'queued',
+            result TEXT,
+            error TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        );
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_analyses_date ON analyses (analysis_date DESC, id DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_analyses_score ON analyses (match_score, analysis_date DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, id)")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pdf_text_cache (
+            file_hash TEXT PRIMARY KEY,
+            text TEXT NOT NULL,
+            page_count INTEGER NOT NULL,
+            created_at REAL NOT NULL
+        );
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS analysis_skills (
+            analysis_id INTEGER NOT NULL REFERENCES analyses (id),
+            kind TEXT NOT NULL,
+            skill TEXT NOT NULL,
+            PRIMARY KEY (analysis_id, kind, skill)
+        );
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_analysis_skills_skill ON analysis_skills (skill, kind, analysis_id)")
+    if FTS5_AVAILABLE:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS analyses_fts USING fts5 (
+                justification, experience, education, skills, tokenize = 'porter unicode61'
+            );
+        ''')
+
+def hash_job_description(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def migrate_deduplicate_job_descriptions(cursor):
+    """
+    Moves job description text out of analyses into a job_descriptions table
+    keyed by content hash. SQLite cannot drop a NOT NULL column portably, so
+    analyses is rebuilt with a job_description_id column; row ids are kept so
+    the skill and full-text indexes stay valid.
+    """
+    cursor.connection.create_function("jd_hash", 1, hash_job_description, deterministic=True)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS job_descriptions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            content_hash TEXT NOT NULL UNIQUE,
+            text TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    ''')
+    cursor.execute('''
+        INSERT OR IGNORE INTO job_descriptions (content_hash, text)
+        SELECT jd_hash(job_description), job_description FROM analyses GROUP BY job_description
+    ''')
+    cursor.execute('''
+        CREATE TABLE analyses_v2 (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            filename TEXT NOT NULL,
+            job_description_id INTEGER NOT NULL REFERENCES job_descriptions (id),
+            match_score INTEGER NOT NULL,
+            justification TEXT,
+            extracted_skills TEXT,
+            extracted_experience TEXT,
+            extracted_education TEXT,
+            missing_keywords TEXT,
+            analysis_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    ''')
+    cursor.execute('''
+        INSERT INTO analyses_v2 (id, filename, job_description_id, match_score, justification, extracted_skills,
+                                 extracted_experience, extracted_education, missing_keywords, analysis_date)
+        SELECT a.id, a.filename, jd.id, a.match_score, a.justification, a.extracted_skills,
+               a.extracted_experience, a.extracted_education, a.missing_keywords, a.analysis_date
+        FROM analyses a JOIN job_descriptions jd ON jd.content_hash = jd_hash(a.job_description)
+    ''')
+    cursor.execute("DROP TABLE analyses")
+    cursor.execute("ALTER TABLE analyses_v2 RENAME TO analyses")
+    cursor.execute("CREATE INDEX idx_analyses_date ON analyses (analysis_date DESC, id DESC)")
+    cursor.execute("CREATE INDEX idx_analyses_score ON analyses (match_score, analysis_date DESC)")
+    cursor.execute("CREATE INDEX idx_analyses_job_description ON analyses (job_description_id)")
+
+def migrate_add_match_runs(cursor):
+    """
+    Groups the analyses produced by one multi-role match so they can be
+    fetched together as a ranked role list.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS match_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            filename TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    ''')
+    cursor.execute("ALTER TABLE analyses ADD COLUMN match_run_id INTEGER REFERENCES match_runs (id)")
+    cursor.execute("CREATE INDEX idx_analyses_match_run ON analyses (match_run_id)")
+
+def migrate_add_prescreened_flag(cursor):
+    """
+    Marks analyses produced by the local pre-screen instead of the LLM. Their
+    match_score is a skill-coverage percentage and their skills are the job's
+    skills found in the resume. Rows stored before the flag existed are
+    recognized by the justification heuristic_analysis() writes.
+    """
+    cursor.execute("ALTER TABLE analyses ADD COLUMN prescreened INTEGER NOT NULL DEFAULT 0")
+    cursor.execute(
+        "UPDATE analyses SET prescreened = 1 WHERE justification LIKE ?",
+        (PRESCREEN_JUSTIFICATION_PREFIX + '%',)
+    )
+
+def migrate_index_analysis_cache_age(cursor):
+    """
+    Lets expired and overflowing analysis_cache rows be pruned by age.
+    """
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_analysis_cache_created ON analysis_cache (created_at)")
+
+def migrate_index_pdf_text_cache_age(cursor):
+    """
+    Lets expired and overflowing pdf_text_cache rows be pruned by age.
+    """
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_pdf_text_cache_created ON pdf_text_cache (created_at)")
+
+# Each migration runs once, in order; PRAGMA user_version records how many have been applied.
+# Append new migrations to the end of this list and never reorder it.
+SCHEMA_MIGRATIONS = [
+    migrate_initial_schema,
+    migrate_deduplicate_job_descriptions,
+    migrate_add_match_runs,
+    migrate_add_prescreened_flag,
+    migrate_index_analysis_cache_age,
+    migrate_index_pdf_text_cache_age,
+]
+
+def init_db():
+    """
+    Applies pending schema migrations and backfills the search index.
+    """
+    conn = get_db_connection()
+    conn.isolation_level = None
+    try:
+        # IMMEDIATE serializes concurrent workers starting up at the same time
+        conn.execute("BEGIN IMMEDIATE")
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        cursor = conn.cursor()
+        for migration in SCHEMA_MIGRATIONS[version:]:
+            migration(cursor)
+        conn.execute(f"PRAGMA user_version = {len(SCHEMA_MIGRATIONS)}")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.isolation_level = ''
+    backfill_search_index(conn)
+    with conn:
+        prune_analysis_cache(conn)
+        prune_pdf_text_cache(conn)
     conn.close()
     print("Database initialized.")
 
+_db_initialized = False
+_db_init_lock = threading.Lock()
+
+def ensure_db_initialized():
+    global _db_initialized
+    if _db_initialized:
+        return
+    with _db_init_lock:
+        if not _db_initialized:
+            init_db()
+            _db_initialized = True
+
+def normalize_skill(skill):
+    return " ".join(str(skill).split()).lower()
+
+def index_analysis(db, analysis_id, analysis_result):
+    """
+    Adds one analysis to the normalized skill table and the full-text index.
+    Runs inside the caller's transaction.
+    """
+    skills = analysis_result.get('extracted_skills') or []
+    missing = analysis_result.get('missing_keywords') or []
+    skill_rows = [(analysis_id, 'extracted', normalize_skill(s)) for s in skills if str(s).strip()]
+    skill_rows += [(analysis_id, 'missing', normalize_skill(s)) for s in missing if str(s).strip()]
+    db.executemany("INSERT OR IGNORE INTO analysis_skills (analysis_id, kind, skill) VALUES (?, ?, ?)", skill_rows)
+    if FTS5_AVAILABLE:
+        db.execute(
+            "INSERT INTO analyses_fts (rowid, justification, experience, education, skills) VALUES (?, ?, ?, ?, ?)",
+            (
+                analysis_id,
+                analysis_result.get('justification') or '',
+                analysis_result.get('extracted_experience') or '',
+                analysis_result.get('extracted_education') or '',
+                " ; ".join(str(s) for s in skills),
+            )
+        )
+
+def backfill_search_index(conn):
+    """
+    Indexes analyses stored before the search tables existed (or by an older
+    version of the app). Cheap when everything is already indexed.
+    """
+    if FTS5_AVAILABLE:
+        high_water = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM analyses_fts").fetchone()[0]
+    else:
+        high_water = conn.execute("SELECT COALESCE(MAX(analysis_id), 0) FROM analysis_skills").fetchone()[0]
+    rows = conn.execute("SELECT * FROM analyses WHERE id > ? ORDER BY id", (high_water,)).fetchall()
+    if not rows:
+        return
+    with conn:
+        for row in rows:
+            index_analysis(conn, row['id'], {
+                'justification': row['justification'],
+                'extracted_experience': row['extracted_experience'],
+                'extracted_education': row['extracted_education'],
+                'extracted_skills': json.loads(row['extracted_skills'] or '[]'),
+                'missing_keywords': json.loads(row['missing_keywords'] or '[]'),
+            })
+    print(f"Indexed {len(rows)} existing analyses for search.")
+
+def get_job_description_id(db, job_description):
+    """
+    Returns the id of the stored job description, inserting it if it is new.
+    Runs inside the caller's transaction.
+    """
+    content_hash = hash_job_description(job_description)
+    db.execute(
+        "INSERT OR IGNORE INTO job_descriptions (content_hash, text) VALUES (?, ?)",
+        (content_hash, job_description)
+    )
+    return db.execute("SELECT id FROM job_descriptions WHERE content_hash = ?", (content_hash,)).fetchone()[0]
+
+def insert_analyses(db, records, match_run_id=None):
+    """
+    Inserts (filename, job_description, analysis_result) records and their search
+    index entries. Runs inside the caller's transaction. Returns the new analysis ids.
+    """
+    analysis_ids = []
+    job_description_ids = {}
+    for filename, job_description, analysis_result in records:
+        if job_description not in job_description_ids:
+            job_description_ids[job_description] = get_job_description_id(db, job_description)
+        cursor = db.execute('''
+            INSERT INTO analyses (filename, job_description_id, match_score, justification, 
+                                  extracted_skills, extracted_experience, extracted_education, missing_keywords,
+                                  match_run_id, prescreened)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            filename,
+            job_description_ids[job_description],
+            analysis_result.get('match_score'),
+            analysis_result.get('justification'),
+            json.dumps(analysis_result.get('extracted_skills', [])),
+            analysis_result.get('extracted_experience'),
+            analysis_result.get('extracted_education'),
+            json.dumps(analysis_result.get('missing_keywords', [])),
+            match_run_id,
+            1 if analysis_result.get('prescreened') else 0
+        ))
+        analysis_ids.append(cursor.lastrowid)
+        index_analysis(db, cursor.lastrowid, analysis_result)
+    return analysis_ids
+
+def save_analyses(records):
+    """
+    Inserts analysis records in a single transaction. Returns the new analysis ids.
+    """
+    db = get_db_connection()
+    try:
+        with timed_stage("db_write"), db:
+            return insert_analyses(db, records)
+    finally:
+        db.close()
+
+def save_match_run(filename, records):
+    """
+    Creates a match run and inserts its analyses in one transaction, so a failed
+    write never leaves an empty run behind. Returns (match_run_id, analysis_ids).
+    """
+    db = get_db_connection()
+    try:
+        with timed_stage("db_write"), db:
+            match_run_id = db.execute("INSERT INTO match_runs (filename) VALUES (?)", (filename,)).lastrowid
+            return match_run_id, insert_analyses(db, records, match_run_id=match_run_id)
+    finally:
+        db.close()
+
 # --- Helper Functions ---
+_pdf_pool = None
+_pdf_pool_pid = None
+_pdf_pool_lock = threading.Lock()
+
+def get_pdf_pool():
+    """
+    Lazily creates the per-process pool used to extract pages in parallel.
+    Children are started from a fork server (or spawned) rather than forked
+    from this process, whose job-queue and request threads may hold locks that
+    a forked child would inherit in a locked state.
+    """
+    global _pdf_pool, _pdf_pool_pid
+    with _pdf_pool_lock:
+        # A forked gunicorn worker must not reuse its parent's pool
+        if _pdf_pool is None or _pdf_pool_pid != os.getpid():
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _pdf_pool = ProcessPoolExecutor(
+                max_workers=PDF_PROCESS_WORKERS, mp_context=multiprocessing.get_context(method)
+            )
+            _pdf_pool_pid = os.getpid()
+        return _pdf_pool
+
+# Pages are joined with a form feed so prompt compaction can tell running
+# headers and footers apart from lines that merely repeat within the text
+PAGE_BREAK = "\f"
+
+def extract_page_range(pdf_bytes, start, stop, max_chars=PDF_MAX_CHARS):
+    """
+    Extracts text from pages [start, stop). Runs inside the process pool, so it
+    re-opens the PDF from bytes rather than sharing a reader across processes.
+    """
+    pdf_reader = PyPDF2.PdfReader(BytesIO(pdf_bytes))
+    parts = []
+    total = 0
+    for page in pdf_reader.pages[start:stop]:
+        page_text = page.extract_text()
+        if page_text:
+            parts.append(page_text)
+            total += len(page_text)
+            if total >= max_chars:
+                break
+    return parts
+
+def read_pdf_text(pdf_bytes):
+    pdf_reader = PyPDF2.PdfReader(BytesIO(pdf_bytes))
+    page_count = min(len(pdf_reader.pages), PDF_MAX_PAGES)
+
+    if page_count < PDF_PARALLEL_MIN_PAGES or PDF_PROCESS_WORKERS <= 1:
+        parts = extract_page_range(pdf_bytes, 0, page_count)
+    else:
+        chunk = -(-page_count // PDF_PROCESS_WORKERS)
+        pool = get_pdf_pool()
+        futures = [
+            pool.submit(extract_page_range, pdf_bytes, start, min(start + chunk, page_count))
+            for start in range(0, page_count, chunk)
+        ]
+        parts = [part for future in futures for part in future.result()]
+
+    return PAGE_BREAK.join(parts)[:PDF_MAX_CHARS], page_count
+
+# Bump when the extracted text changes shape (e.g. the page separator)
+PDF_EXTRACTION_VERSION = 2
+
+def pdf_cache_key(pdf_bytes):
+    """
+    SHA-256 of the file together with the extraction caps and version, so a
+    change to PDF_MAX_PAGES or PDF_MAX_CHARS re-extracts re-uploaded files.
+    """
+    digest = hashlib.sha256(f"{PDF_EXTRACTION_VERSION}:{PDF_MAX_PAGES}:{PDF_MAX_CHARS}\x00".encode('utf-8'))
+    digest.update(pdf_bytes)
+    return digest.hexdigest()
+
+def prune_pdf_text_cache(db, ttl_seconds=PDF_CACHE_TTL_SECONDS, max_entries=PDF_CACHE_MAX_ENTRIES):
+    """
+    Deletes expired rows and, beyond max_entries, the oldest ones. Runs inside
+    the caller's transaction.
+    """
+    db.execute("DELETE FROM pdf_text_cache WHERE created_at < ?", (time.time() - ttl_seconds,))
+    db.execute(
+        "DELETE FROM pdf_text_cache WHERE file_hash IN "
+        "(SELECT file_hash FROM pdf_text_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+        (max_entries,)
+    )
+
+def get_cached_pdf_text(file_hash):
+    db = get_db_connection()
+    row = db.execute(
+        "SELECT text FROM pdf_text_cache WHERE file_hash = ? AND created_at >= ?",
+        (file_hash, time.time() - PDF_CACHE_TTL_SECONDS)
+    ).fetchone()
+    db.close()
+    return row['text'] if row else None
+
+_pdf_cache_writes = itertools.count(1)
+
+def cache_pdf_text(file_hash, text, page_count):
+    db = get_db_connection()
+    with db:
+        db.execute(
+            "INSERT OR REPLACE INTO pdf_text_cache (file_hash, text, page_count, created_at) VALUES (?, ?, ?, ?)",
+            (file_hash, text, page_count, time.time())
+        )
+        if next(_pdf_cache_writes) % PDF_CACHE_PRUNE_EVERY == 0:
+            prune_pdf_text_cache(db)
+    db.close()
+
 def extract_text_from_pdf(file_stream):
+    """
+    Returns the text of a PDF, capped at PDF_MAX_PAGES pages and PDF_MAX_CHARS
+    characters. Results are cached by pdf_cache_key() so re-uploads skip parsing.
+    """
     try:
-        pdf_reader = PyPDF2.PdfReader(file_stream)
-        text = ""
-        for page in pdf_reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text
+        pdf_bytes = file_stream.getvalue() if hasattr(file_stream, 'getvalue') else file_stream.read()
+        file_hash = pdf_cache_key(pdf_bytes)
+        try:
+            cached = get_cached_pdf_text(file_hash)
+            if cached is not None:
+                CACHE_LOOKUPS.inc(cache="pdf_text", result="hit")
+                return cached
+        except Exception as e:
+            print(f"PDF cache read error: {e}")
+        CACHE_LOOKUPS.inc(cache="pdf_text", result="miss")
+
+        with timed_stage("pdf_extract"):
+            text, page_count = read_pdf_text(pdf_bytes)
+        if text:
+            try:
+                cache_pdf_text(file_hash, text, page_count)
+            except Exception as e:
+                print(f"PDF cache write error: {e}")
         return text
     except Exception as e:
         print(f"Error reading PDF file: {e}")
         return None
 
-def get_llm_analysis(resume_text, job_description):
+# --- Prompt Compaction ---
+CHARS_PER_TOKEN = 4
+KEY_SECTIONS = ('skills', 'experience', 'education')
+SECTION_HEADINGS = {
+    'skills': ('skills', 'technical skills', 'core skills', 'key skills', 'core competencies', 'technologies', 'tech stack'),
+    'experience': ('experience', 'work experience', 'professional experience', 'employment', 'employment history', 'work history'),
+    'education': ('education', 'academic background', 'qualifications', 'academics'),
+    'other': (
+        'summary', 'profile', 'professional summary', 'objective', 'projects', 'certifications', 'awards',
+        'achievements', 'publications', 'interests', 'hobbies', 'languages', 'references', 'volunteering',
+    ),
+}
+HEADING_LOOKUP = {heading: section for section, headings in SECTION_HEADINGS.items() for heading in headings}
+BOILERPLATE_PATTERNS = [
+    re.compile(r"^references (are )?available (up)?on request\.?$", re.IGNORECASE),
+    re.compile(r"^(curriculum vitae|resume|r\u00e9sum\u00e9)$", re.IGNORECASE),
+]
+PAGE_NUMBER_PATTERN = re.compile(r"^-?\s*(page\s*(\d+)(\s*(of|/)\s*(\d+))?|(\d+)\s*(of|/)\s*(\d+))\s*-?$", re.IGNORECASE)
+PAGE_EDGE_LINES = 2
+
+def estimate_tokens(text):
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+def normalize_whitespace(text):
     """
-    Uses Google Gemini to extract structured data from the resume against the job description.
+    Collapses runs of spaces and tabs, strips every line and keeps at most one
+    blank line between paragraphs.
     """
-    prompt = f"""
+    lines = [re.sub(r"[ \t\u00a0]+", " ", line).strip() for line in text.splitlines()]
+    compacted = []
+    for line in lines:
+        if line or (compacted and compacted[-1]):
+            compacted.append(line)
+    return "\n".join(compacted).strip()
+
+def is_page_number(line):
+    """
+    Matches "Page 3", "Page 3 of 10", "3 of 10" and "3/10", but not bare numbers
+    or ranges such as "2019/2020" that are part of the resume itself.
+    """
+    match = PAGE_NUMBER_PATTERN.match(line)
+    if not match:
+        return False
+    if match.group(2):
+        return True
+    page, total = int(match.group(6)), int(match.group(8))
+    return 0 < page <= total <= PDF_MAX_PAGES
+
+def page_edges(lines):
+    content = [i for i, line in enumerate(lines) if line]
+    return set(content[:PAGE_EDGE_LINES] + content[-PAGE_EDGE_LINES:])
+
+def strip_boilerplate(pages):
+    """
+    Takes the text split into pages (lists of lines) and returns the lines with
+    page numbers and stock phrases removed. A line counts as a running header or
+    footer only when it sits at the top or bottom of at least two pages; its
+    first copy is kept and the repeats at later page edges are dropped.
+    """
+    edges = [page_edges(lines) for lines in pages]
+    edge_counts = Counter(line for lines, idx in zip(pages, edges) for line in {lines[i] for i in idx})
+    seen = set()
+    kept = []
+    for lines, idx in zip(pages, edges):
+        for i, line in enumerate(lines):
+            if any(pattern.match(line) for pattern in BOILERPLATE_PATTERNS) or is_page_number(line):
+                continue
+            if i in idx and edge_counts[line] >= 2:
+                if line in seen:
+                    continue
+                seen.add(line)
+            kept.append(line)
+    return kept
+
+def section_for_heading(line):
+    key = line.lower().strip(' :-\u2022*#')
+    if len(key) > 40:
+        return None
+    return HEADING_LOOKUP.get(key)
+
+def split_sections(lines):
+    sections = [['header', []]]
+    for line in lines:
+        section = section_for_heading(line)
+        if section:
+            sections.append([section, [line]])
+        else:
+            sections[-1][1].append(line)
+    return [(name, "\n".join(body).strip()) for name, body in sections if "\n".join(body).strip()]
+
+def truncate_text(text, max_chars):
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind("\n", 0, max_chars)
+    if cut < max_chars // 2:
+        cut = max_chars
+    return text[:cut].rstrip() + "\n[...]"
+
+def fit_sections_to_budget(sections, max_chars):
+    """
+    Keeps the skills, experience and education sections intact when they fit,
+    filling the remaining budget with the other sections in document order.
+    If the key sections alone are too long, each is shortened proportionally.
+    """
+    key_length = sum(len(body) for name, body in sections if name in KEY_SECTIONS)
+    if key_length >= max_chars:
+        return [
+            truncate_text(body, max(1, max_chars * len(body) // key_length))
+            for name, body in sections if name in KEY_SECTIONS
+        ]
+
+    remaining = max_chars - key_length
+    kept = []
+    for name, body in sections:
+        if name in KEY_SECTIONS:
+            kept.append(body)
+        elif remaining > 0:
+            kept.append(truncate_text(body, remaining))
+            remaining -= len(body)
+    return kept
+
+def compact_resume_text(text, token_budget=PROMPT_RESUME_TOKEN_BUDGET):
+    """
+    Returns the resume unchanged apart from whitespace when it fits the budget.
+    Otherwise page boilerplate is removed first, and only if that is not enough
+    are sections trimmed by fit_sections_to_budget().
+    """
+    max_chars = token_budget * CHARS_PER_TOKEN
+    compacted = normalize_whitespace(text)
+    if len(compacted) <= max_chars:
+        return compacted
+
+    pages = [normalize_whitespace(page).splitlines() for page in text.split(PAGE_BREAK)]
+    compacted = normalize_whitespace("\n".join(strip_boilerplate(pages)))
+    if len(compacted) <= max_chars:
+        return compacted
+    return "\n\n".join(fit_sections_to_budget(split_sections(compacted.splitlines()), max_chars))
+
+def compact_job_description(text, token_budget=PROMPT_JD_TOKEN_BUDGET):
+    return truncate_text(normalize_whitespace(text), token_budget * CHARS_PER_TOKEN)
+
+# --- LLM Providers ---
+# Provider errors worth retrying: rate limits, overload, timeouts and dropped
+# connections. Anything else (invalid or oversized request, bad credentials, a
+# blocked response) fails immediately and does not count against the breaker.
+TRANSIENT_LLM_ERRORS = (
+    google_exceptions.TooManyRequests,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+    ConnectionError,
+    TimeoutError,
+)
+
+class GeminiProvider:
+    """
+    Google Gemini backend. The model object, generation config and safety
+    settings are built once and reused for every call.
+    """
+    name = "gemini"
+
+    def __init__(self, model_name=MODEL_NAME):
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+        self.generation_config = genai.types.GenerationConfig(
+            response_mime_type="application/json"
+        )
+        self.safety_settings = [
+            {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
+            {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
+            {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
+            {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
+        ]
+
+    def generate(self, prompt):
+        response = self.model.generate_content(
+            prompt, 
+            generation_config=self.generation_config,
+            safety_settings=self.safety_settings
+        )
+        usage = getattr(response, 'usage_metadata', None)
+        if usage:
+            LLM_TOKENS.inc(usage.prompt_token_count or 0, provider=self.name, kind="prompt")
+            LLM_TOKENS.inc(usage.candidates_token_count or 0, provider=self.name, kind="completion")
+        return response.text
+
+class FakeProvider:
+    """
+    Offline stand-in for load testing. Sleeps for a tunable latency, fails at a
+    tunable rate, and otherwise returns a well-formed analysis that depends only
+    on the prompt, so repeated runs are reproducible.
+    """
+    name = "fake"
+    SKILL_VOCABULARY = (
+        "Python", "Java", "SQL", "JavaScript", "React", "Docker", "Kubernetes", "AWS",
+        "Go", "Machine Learning", "Linux", "Flask", "Django", "Git", "CI/CD", "Figma",
+    )
+
+    def __init__(self, model_name=MODEL_NAME, latency_ms=FAKE_LLM_LATENCY_MS, jitter_ms=FAKE_LLM_JITTER_MS,
+                 failure_rate=FAKE_LLM_FAILURE_RATE, seed=FAKE_LLM_SEED):
+        self.model_name = model_name
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate(self, prompt):
+        with self._lock:
+            delay = max(0.0, self._random.gauss(self.latency_ms, self.jitter_ms)) / 1000
+            fail = self._random.random() < self.failure_rate
+        time.sleep(delay)
+        if fail:
+            raise google_exceptions.ServiceUnavailable("Simulated LLM failure")
+
+        digest = hashlib.sha256(prompt.encode('utf-8')).digest()
+        skills = [self.SKILL_VOCABULARY[b % len(self.SKILL_VOCABULARY)] for b in digest[1:6]]
+        missing = [self.SKILL_VOCABULARY[b % len(self.SKILL_VOCABULARY)] for b in digest[6:8]]
+        output = json.dumps({
+            "match_score": digest[0] % 101,
+            "justification": "Synthetic analysis generated by the fake LLM provider.",
+            "extracted_skills": list(dict.fromkeys(skills)),
+            "extracted_experience": f"{digest[8] % 15} years of synthetic experience.",
+            "extracted_education": "B.S. in Computer Science (synthetic).",
+            "missing_keywords": [m for m in dict.fromkeys(missing) if m not in skills],
+        })
+        # Roughly four characters per token
+        LLM_TOKENS.inc(len(prompt) // 4, provider=self.name, kind="prompt")
+        LLM_TOKENS.inc(len(output) // 4, provider=self.name, kind="completion")
+        return output
+
+LLM_PROVIDERS = {
+    "gemini": GeminiProvider,
+    "fake": FakeProvider,
+}
+
+_llm_provider = None
+_llm_provider_lock = threading.Lock()
+
+def get_llm_provider():
+    """
+    Returns the process-wide provider instance selected by LLM_PROVIDER.
+    """
+    global _llm_provider
+    with _llm_provider_lock:
+        if _llm_provider is None:
+            if LLM_PROVIDER not in LLM_PROVIDERS:
+                raise ValueError(f"Unknown LLM_PROVIDER '{LLM_PROVIDER}'. Choose from: {', '.join(LLM_PROVIDERS)}")
+            _llm_provider = LLM_PROVIDERS[LLM_PROVIDER]()
+        return _llm_provider
+
+ANALYSIS_PROMPT_TEMPLATE = textwrap.dedent("""
     You are an expert technical recruiter and talent analyst. Your task is to analyze the following resume against the provided job description and extract structured data.
     Your response must be a single, clean JSON object and nothing else. Do not wrap it in markdown.
 
@@ -90,35 +1065,800 @@ def get_llm_analysis(resume_text, job_description):
     ---
     {resume_text}
     ---
+""").strip()
+
+# Bump when compact_resume_text / compact_job_description change their output,
+# so cached analyses built from the old prompts are not served any more
+PROMPT_COMPACTION_VERSION = 2
+PROMPT_FINGERPRINT = ":".join([
+    hashlib.sha256(ANALYSIS_PROMPT_TEMPLATE.encode('utf-8')).hexdigest()[:16],
+    f"c{PROMPT_COMPACTION_VERSION}",
+    str(PROMPT_RESUME_TOKEN_BUDGET),
+    str(PROMPT_JD_TOKEN_BUDGET),
+])
+
+def build_analysis_prompt(resume_text, job_description):
+    return ANALYSIS_PROMPT_TEMPLATE.format(job_description=job_description, resume_text=resume_text)
+
+def build_compact_prompt(resume_text, job_description):
+    """
+    Builds the analysis prompt from whitespace-normalized, boilerplate-free and
+    budget-capped inputs, and logs the estimated tokens saved.
+    """
+    with timed_stage("prompt_compaction"):
+        raw_tokens = estimate_tokens(resume_text) + estimate_tokens(job_description)
+        resume_text = compact_resume_text(resume_text)
+        job_description = compact_job_description(job_description)
+        saved = raw_tokens - estimate_tokens(resume_text) - estimate_tokens(job_description)
+    if saved > 0:
+        PROMPT_TOKENS_SAVED.inc(saved)
+        print(f"Prompt compaction saved ~{saved} of ~{raw_tokens} input tokens.")
+    return build_analysis_prompt(resume_text, job_description)
+
+# --- Resilient LLM Calls ---
+class LLMUnavailableError(Exception):
+    """
+    Raised when an LLM call is refused locally (open circuit, rate limit or
+    in-flight limit) without reaching the provider. retry_after is a hint, in
+    seconds, for when a new attempt is likely to be accepted.
+    """
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = max(1, math.ceil(retry_after))
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: refills at `rate` tokens per second up to
+    `capacity`. acquire() blocks until a token is available or the timeout passes.
+    """
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `reset_seconds`; then lets a single trial call through (half-open) and
+    closes again if it succeeds.
+    """
+    def __init__(self, failure_threshold, reset_seconds):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at >= self.reset_seconds and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def cancel_trial(self):
+        """
+        Gives up a half-open trial slot that was granted but never used.
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def retry_after(self):
+        """
+        Seconds until the breaker will allow a trial call; 0 when closed.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return 0
+            return max(0, self.reset_seconds - (time.monotonic() - self._opened_at))
+
+llm_rate_limiter = TokenBucket(LLM_RATE_LIMIT_RPM / 60, LLM_RATE_LIMIT_BURST) if LLM_RATE_LIMIT_RPM > 0 else None
+llm_in_flight = threading.BoundedSemaphore(LLM_MAX_IN_FLIGHT)
+llm_circuit_breaker = CircuitBreaker(LLM_BREAKER_FAILURES, LLM_BREAKER_RESET_SECONDS)
+
+def backoff_delay(attempt):
     """
-    safety_settings = [
-        {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
-        {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
-        {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
-        {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
+    Exponential backoff with full jitter for the given retry attempt (1-based).
+    """
+    return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** (attempt - 1))))
+
+def close_truncated_json(text):
+    """
+    Appends the quotes and brackets needed to close JSON cut off mid-response.
+    """
+    stack = []
+    in_string = False
+    escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in '{[':
+            stack.append('}' if char == '{' else ']')
+        elif char in '}]' and stack:
+            stack.pop()
+    closed = text + ('"' if in_string else '')
+    closed = re.sub(r",\s*$", "", closed)
+    return closed + "".join(reversed(stack))
+
+def repair_json(text):
+    """
+    Best-effort recovery of a JSON object from a malformed LLM response:
+    markdown fences, surrounding prose, trailing commas, Python-style literals
+    and truncated output. Returns a dict or None.
+    """
+    if not isinstance(text, str):
+        return None
+    candidate = re.sub(r"^\s*```(?:json)?\s*|\s*```\s*$", "", text.strip(), flags=re.IGNORECASE)
+    start = candidate.find('{')
+    if start == -1:
+        return None
+    end = candidate.rfind('}')
+    candidate = candidate[start:end + 1] if end > start else candidate[start:]
+    candidate = candidate.replace('\u201c', '"').replace('\u201d', '"')
+
+    attempts = [
+        lambda c: c,
+        lambda c: re.sub(r",\s*([}\]])", r"\1", c),
+        lambda c: re.sub(r",\s*([}\]])", r"\1", close_truncated_json(c)),
     ]
-    
+    for fix in attempts:
+        try:
+            result = json.loads(fix(candidate))
+            if isinstance(result, dict):
+                return result
+        except ValueError:
+            pass
     try:
-        model = genai.GenerativeModel('models/gemini-2.5-flash')
-        
-        generation_config = genai.types.GenerationConfig(
-            response_mime_type="application/json"
-        )
-        
-        response = model.generate_content(
-            prompt, 
-            generation_config=generation_config,
-            safety_settings=safety_settings
-        )
-        
-        return json.loads(response.text)
+        result = ast.literal_eval(candidate)
+        if isinstance(result, dict):
+            return result
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        pass
+    return None
+
+def normalize_analysis(result):
+    """
+    Coerces an analysis dict to the expected types so downstream code and the
+    database never see a wrong shape.
+    """
+    try:
+        score = int(round(float(result.get('match_score', 0))))
+    except (TypeError, ValueError):
+        score = 0
+    result['match_score'] = max(0, min(100, score))
+    for key in ('extracted_skills', 'missing_keywords'):
+        value = result.get(key) or []
+        if isinstance(value, str):
+            value = [v.strip() for v in value.split(',') if v.strip()]
+        result[key] = [str(v) for v in value] if isinstance(value, list) else []
+    for key in ('justification', 'extracted_experience', 'extracted_education'):
+        value = result.get(key)
+        result[key] = value if isinstance(value, str) else ("" if value is None else json.dumps(value))
+    return result
+
+def parse_llm_response(response_text):
+    try:
+        result = json.loads(response_text)
+        if isinstance(result, dict):
+            return result
+    except (TypeError, ValueError):
+        pass
+    result = repair_json(response_text)
+    if result is not None:
+        JSON_REPAIRS.inc(provider=LLM_PROVIDER)
+    return result
+
+def call_llm(prompt):
+    """
+    Sends the prompt through the shared rate limiter, in-flight limit and
+    circuit breaker, retrying transient failures and unparseable responses with
+    exponential backoff. Returns the parsed analysis dict.
+    Raises LLMUnavailableError when the call is refused locally, a permanent
+    provider error at once, or the last transient error once retries are exhausted.
+    """
+    provider = get_llm_provider()
+    last_error = None
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        if attempt:
+            LLM_RETRIES.inc(provider=LLM_PROVIDER)
+            time.sleep(backoff_delay(attempt))
+        if not llm_circuit_breaker.allow():
+            LLM_REJECTIONS.inc(reason="circuit_open")
+            raise LLMUnavailableError("LLM circuit breaker is open", llm_circuit_breaker.retry_after())
+        if llm_rate_limiter and not llm_rate_limiter.acquire(LLM_ACQUIRE_TIMEOUT):
+            llm_circuit_breaker.cancel_trial()
+            LLM_REJECTIONS.inc(reason="rate_limited")
+            raise LLMUnavailableError("Timed out waiting for the LLM rate limiter", 1 / llm_rate_limiter.rate)
+        if not llm_in_flight.acquire(timeout=LLM_ACQUIRE_TIMEOUT):
+            llm_circuit_breaker.cancel_trial()
+            LLM_REJECTIONS.inc(reason="in_flight_limit")
+            raise LLMUnavailableError("Timed out waiting for an LLM slot", LLM_BACKOFF_MAX)
+        try:
+            with timed_stage("llm"):
+                response_text = provider.generate(prompt)
+        except TRANSIENT_LLM_ERRORS as e:
+            llm_circuit_breaker.record_failure()
+            LLM_FAILURES.inc(provider=LLM_PROVIDER, kind="transient")
+            print(f"An error occurred with the {LLM_PROVIDER} LLM provider (attempt {attempt + 1}): {e}")
+            last_error = e
+            continue
+        except Exception as e:
+            # The provider answered, so this says nothing about its health
+            llm_circuit_breaker.cancel_trial()
+            LLM_FAILURES.inc(provider=LLM_PROVIDER, kind="permanent")
+            print(f"The {LLM_PROVIDER} LLM provider rejected the request (not retried): {e}")
+            raise
+        finally:
+            llm_in_flight.release()
+
+        llm_circuit_breaker.record_success()
+        result = parse_llm_response(response_text)
+        if result is not None:
+            return normalize_analysis(result)
+        JSON_PARSE_FAILURES.inc(provider=LLM_PROVIDER)
+        print(f"The {LLM_PROVIDER} LLM provider returned invalid JSON (attempt {attempt + 1}).")
+        last_error = ValueError("LLM response was not valid JSON")
+    raise last_error
+
+def get_llm_analysis(resume_text, job_description):
+    """
+    Uses the configured LLM provider to extract structured data from the resume against the job description.
+    Returns None if the provider fails; LLMUnavailableError propagates so callers
+    can ask the client to retry later instead of reporting a failure.
+    """
+    prompt = build_compact_prompt(resume_text, job_description)
+    try:
+        return call_llm(prompt)
+    except LLMUnavailableError:
+        raise
     except Exception as e:
-        print(f"An error occurred with the Gemini API: {e}")
+        print(f"LLM analysis failed: {e}")
         return None
 
+# --- Local Pre-screening ---
+STOPWORDS = frozenset('''
+    a an and are as at be by for from has have in into is it its of on or our that the their
+    this to we with you your will who what role description key skills skill experience
+    years year work working team strong knowledge ability using use etc must should plus
+    need needs looking seeking join ideal candidate responsibilities requirements
+    professional development develop developing building build built designing operating hands-on
+    familiarity familiar proficiency proficient solid excellent good great deep understanding
+    production environment environments including such like similar related relevant least
+    minimum preferred required bonus nice senior junior
+'''.split())
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#.-]*")
+BULLET_PATTERN = re.compile(r"^\s*(?:[-*\u2022]|\d+[.)])\s+(.+)$", re.MULTILINE)
+SKILL_BULLET_MAX_WORDS = 4
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+def tokenize(text):
+    return [t.rstrip('./-') for t in TOKEN_PATTERN.findall(text.lower())]
+
+def skill_terms(text):
+    """
+    Distinct terms of text that can name a skill: no stopwords, no bare numbers
+    such as the "5+" in "5+ years".
+    """
+    terms = [t for t in tokenize(text) if t not in STOPWORDS and len(t) > 1 and any(c.isalpha() for c in t)]
+    return list(dict.fromkeys(terms))
+
+def extract_job_skills(job_description):
+    """
+    Returns the skills a job asks for. Short bulleted items (as in the app's
+    templates) are kept as skill phrases; longer bullets are requirement
+    sentences and contribute their individual terms. Without bullets, the
+    terms of the whole description are used.
+    """
+    bullets = [b.strip().strip('*').strip() for b in BULLET_PATTERN.findall(job_description)]
+    bullets = [b for b in bullets if b]
+    if not bullets:
+        return skill_terms(job_description)
+    skills = {}
+    for bullet in bullets:
+        if len(bullet.split()) <= SKILL_BULLET_MAX_WORDS:
+            skills.setdefault(bullet.lower(), bullet)
+        else:
+            for term in skill_terms(bullet):
+                skills.setdefault(term, term)
+    return list(skills.values())
+
+def skill_in_text(skill, text_terms, text_lower):
+    terms = skill_terms(skill)
+    if not terms:
+        return False
+    if len(terms) == 1:
+        return terms[0] in text_terms
+    return skill.lower() in text_lower or all(t in text_terms for t in terms)
+
+def bm25_scores(documents, query_terms):
+    """
+    Okapi BM25 score of each tokenized document against the query terms, with
+    IDF computed over the documents themselves.
+    """
+    n = len(documents)
+    if not n or not query_terms:
+        return [0.0] * n
+    avg_len = sum(len(d) for d in documents) / n or 1.0
+    frequencies = [Counter(d) for d in documents]
+    df = Counter(t for f in frequencies for t in query_terms if t in f)
+    idf = {t: math.log(1 + (n - df[t] + 0.5) / (df[t] + 0.5)) for t in query_terms}
+    scores = []
+    for doc, freq in zip(documents, frequencies):
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * len(doc) / avg_len)
+        scores.append(sum(
+            idf[t] * freq[t] * (BM25_K1 + 1) / (freq[t] + norm)
+            for t in query_terms if t in freq
+        ))
+    return scores
+
+PRESCREEN_JUSTIFICATION_PREFIX = "Pre-screened locally without the language model"
+
+def heuristic_analysis(coverage, matched, missing):
+    return {
+        "match_score": coverage,
+        "justification": (
+            f"{PRESCREEN_JUSTIFICATION_PREFIX}: the resume covers {len(matched)} "
+            f"of {len(matched) + len(missing)} skills from the job description ({coverage}%)."
+        ),
+        "extracted_skills": matched,
+        "extracted_experience": "Not analyzed (below pre-screening cutoff).",
+        "extracted_education": "Not analyzed (below pre-screening cutoff).",
+        "missing_keywords": missing,
+        "prescreened": True,
+    }
+
+def skill_coverage(text, skills, terms=None):
+    """
+    Returns (coverage 0-100, matched skills, missing skills) for one resume text.
+    """
+    text_terms = set(terms if terms is not None else tokenize(text))
+    text_lower = text.lower()
+    matched = [s for s in skills if skill_in_text(s, text_terms, text_lower)]
+    missing = [s for s in skills if s not in matched]
+    coverage = round(100 * len(matched) / len(skills)) if skills else 100
+    return coverage, matched, missing
+
+def prescreen_roles(resume_text, job_descriptions, top_k=MULTI_MATCH_TOP_K, min_score=PRESCREEN_MIN_SCORE):
+    """
+    Counterpart of prescreen_resumes for one resume against many job
+    descriptions: the top_k roles by skill coverage at or above min_score go to
+    the LLM, the rest get a heuristic result. Returns one
+    (send_to_llm, heuristic_result) pair per job description.
+    """
+    terms = tokenize(resume_text)
+    decisions = []
+    candidates = []
+    for i, job_description in enumerate(job_descriptions):
+        coverage, matched, missing = skill_coverage(resume_text, extract_job_skills(job_description), terms)
+        decisions.append((coverage >= min_score, heuristic_analysis(coverage, matched, missing)))
+        if coverage >= min_score:
+            candidates.append((coverage, -i))
+
+    if top_k and len(candidates) > top_k:
+        candidates.sort(reverse=True)
+        for _, neg_i in candidates[top_k:]:
+            decisions[-neg_i] = (False, decisions[-neg_i][1])
+
+    return [(send, None if send else result) for send, result in decisions]
+
+def prescreen_resumes(texts, job_description, top_k=PRESCREEN_TOP_K, min_score=PRESCREEN_MIN_SCORE):
+    """
+    Deterministically ranks resume texts against the job description. Returns one
+    (send_to_llm, heuristic_result) pair per text; heuristic_result is filled in
+    for resumes that should not go to the LLM. Empty texts get (False, None).
+    """
+    skills = extract_job_skills(job_description)
+    query_terms = list(dict.fromkeys(t for s in skills for t in skill_terms(s)))
+    documents = [tokenize(t) if t else [] for t in texts]
+    scores = bm25_scores(documents, query_terms)
+
+    decisions = []
+    candidates = []
+    for i, (text, doc) in enumerate(zip(texts, documents)):
+        if not text:
+            decisions.append((False, None))
+            continue
+        coverage, matched, missing = skill_coverage(text, skills, doc)
+        decisions.append((coverage >= min_score, heuristic_analysis(coverage, matched, missing)))
+        if coverage >= min_score:
+            candidates.append((coverage, scores[i], i))
+
+    if top_k and len(candidates) > top_k:
+        candidates.sort(reverse=True)
+        for _, _, i in candidates[top_k:]:
+            decisions[i] = (False, decisions[i][1])
+
+    return [(send, None if send else result) for send, result in decisions]
+
+# --- Analysis Cache ---
+def prune_analysis_cache(db, ttl_seconds=CACHE_TTL_SECONDS, max_entries=CACHE_DB_MAX_ENTRIES):
+    """
+    Deletes expired rows and, beyond max_entries, the oldest ones. Runs inside
+    the caller's transaction.
+    """
+    db.execute("DELETE FROM analysis_cache WHERE created_at < ?", (time.time() - ttl_seconds,))
+    db.execute(
+        "DELETE FROM analysis_cache WHERE cache_key IN "
+        "(SELECT cache_key FROM analysis_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+        (max_entries,)
+    )
+
+class AnalysisCache:
+    """
+    Two-level cache for LLM analyses: a thread-safe in-process LRU with TTL,
+    backed by the analysis_cache table so results survive restarts and are
+    shared between workers.
+    """
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl_seconds=CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+
+    @staticmethod
+    def make_key(resume_text, job_description, model=MODEL_NAME, prompt=PROMPT_FINGERPRINT):
+        normalized_jd = " ".join(job_description.split()).lower()
+        digest = hashlib.sha256()
+        for part in (model, prompt, normalized_jd, resume_text):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\x00')
+        return digest.hexdigest()
+
+    def _is_fresh(self, created_at):
+        return (time.time() - created_at) < self.ttl_seconds
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created_at, result = entry
+                if self._is_fresh(created_at):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return result
+                del self._entries[key]
+
+        result = None
+        try:
+            db = get_db_connection()
+            row = db.execute(
+                "SELECT result, created_at FROM analysis_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row and not self._is_fresh(row['created_at']):
+                db.execute("DELETE FROM analysis_cache WHERE cache_key = ?", (key,))
+                db.commit()
+                row = None
+            db.close()
+            if row:
+                result = json.loads(row['result'])
+                self._remember(key, row['created_at'], result)
+        except Exception as e:
+            print(f"Cache read error: {e}")
+
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+
+    def set(self, key, result, model=MODEL_NAME):
+        created_at = time.time()
+        self._remember(key, created_at, result)
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % CACHE_PRUNE_EVERY == 0
+        try:
+            db = get_db_connection()
+            with db:
+                db.execute(
+                    "INSERT OR REPLACE INTO analysis_cache (cache_key, model, result, created_at) VALUES (?, ?, ?, ?)",
+                    (key, model, json.dumps(result), created_at)
+                )
+                if prune:
+                    prune_analysis_cache(db, self.ttl_seconds)
+            db.close()
+        except Exception as e:
+            print(f"Cache write error: {e}")
+
+    def _remember(self, key, created_at, result):
+        with self._lock:
+            self._entries[key] = (created_at, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+analysis_cache = AnalysisCache()
+
+def get_cached_llm_analysis(resume_text, job_description):
+    """
+    Returns the analysis for this resume/job description pair, calling the LLM
+    only when no fresh cached result exists.
+    """
+    key = AnalysisCache.make_key(resume_text, job_description)
+    cached = analysis_cache.get(key)
+    CACHE_LOOKUPS.inc(cache="analysis", result="miss" if cached is None else "hit")
+    if cached is not None:
+        return cached
+    result = get_llm_analysis(resume_text, job_description)
+    if result:
+        analysis_cache.set(key, result)
+    return result
+
+# --- Background Job Queue ---
+JOB_FINISHED_STATUSES = ('done', 'failed')
+
+def enqueue_jobs(files, job_description):
+    """
+    Persists (filename, pdf_bytes) submissions as queued jobs and returns their ids.
+    """
+    batch_id = uuid.uuid4().hex
+    now = time.time()
+    db = get_db_connection()
+    try:
+        with db:
+            job_ids = []
+            for filename, payload in files:
+                cursor = db.execute('''
+                    INSERT INTO jobs (batch_id, filename, job_description, payload, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (batch_id, filename, job_description, payload, now, now))
+                job_ids.append(cursor.lastrowid)
+    finally:
+        db.close()
+    job_queue.wake()
+    return batch_id, job_ids
+
+def claim_next_job():
+    """
+    Atomically moves the oldest queued job to 'running'. Safe across threads and
+    gunicorn workers because the claim happens inside an IMMEDIATE transaction.
+    """
+    db = get_db_connection()
+    db.isolation_level = None
+    try:
+        db.execute("BEGIN IMMEDIATE")
+        row = db.execute(
+            "SELECT * FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1"
+        ).fetchone()
+        if row:
+            db.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (time.time(), row['id'])
+            )
+        db.execute("COMMIT")
+        return row
+    except Exception:
+        db.execute("ROLLBACK")
+        raise
+    finally:
+        db.close()
+
+def finish_job(job_id, result=None, error=None):
+    status = 'failed' if error else 'done'
+    db = get_db_connection()
+    try:
+        with db:
+            db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, payload = NULL, updated_at = ? WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job_id)
+            )
+    finally:
+        db.close()
+
+def requeue_stale_jobs():
+    """
+    Returns jobs left 'running' by a crashed or restarted worker to the queue,
+    or fails them once they have used up JOB_MAX_ATTEMPTS, so a file that keeps
+    killing its worker is not retried forever.
+    """
+    now = time.time()
+    db = get_db_connection()
+    try:
+        with db:
+            db.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, payload = NULL, updated_at = ? "
+                "WHERE status = 'running' AND updated_at < ? AND attempts >= ?",
+                ("The worker stopped while processing this job too many times", now, now - JOB_STALE_SECONDS, JOB_MAX_ATTEMPTS)
+            )
+            db.execute(
+                "UPDATE jobs SET status = 'queued', updated_at = ? WHERE status = 'running' AND updated_at < ?",
+                (now, now - JOB_STALE_SECONDS)
+            )
+    finally:
+        db.close()
+
+def requeue_job(job_id):
+    db = get_db_connection()
+    try:
+        with db:
+            db.execute(
+                "UPDATE jobs SET status = 'queued', updated_at = ? WHERE id = ?", (time.time(), job_id)
+            )
+    finally:
+        db.close()
+
+def process_job(job):
+    resume_text = extract_text_from_pdf(BytesIO(job['payload']))
+    if not resume_text:
+        return None, "Could not extract text from PDF"
+    send_to_llm, analysis_result = prescreen_resumes([resume_text], job['job_description'])[0]
+    if not send_to_llm and PRESCREEN_MODE == 'drop':
+        return None, "Below the pre-screening cutoff"
+    if send_to_llm:
+        try:
+            analysis_result = get_cached_llm_analysis(resume_text, job['job_description'])
+        except LLMUnavailableError as e:
+            if job['attempts'] < JOB_MAX_ATTEMPTS:
+                raise
+            return None, f"The language model is temporarily unavailable: {e}"
+    if not analysis_result:
+        retry_after = llm_circuit_breaker.retry_after()
+        if retry_after and job['attempts'] < JOB_MAX_ATTEMPTS:
+            raise LLMUnavailableError("LLM circuit breaker is open", retry_after)
+        return None, "Failed to get analysis from the language model"
+    try:
+        save_analyses([(job['filename'], job['job_description'], analysis_result)])
+    except Exception as e:
+        print(f"Database Error: {e}")
+    return analysis_result, None
+
+class JobQueue:
+    """
+    Local pool of daemon threads draining the jobs table. Threads are started
+    lazily on first use so importing the module stays side-effect free.
+    """
+    def __init__(self, num_workers=JOB_WORKERS):
+        self.num_workers = num_workers
+        self._threads = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._last_recovery = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            self.recover_stale_jobs()
+            for i in range(self.num_workers):
+                thread = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def wake(self):
+        self.start()
+        self._wakeup.set()
+
+    def recover_stale_jobs(self):
+        """
+        Runs requeue_stale_jobs at most once per JOB_STALE_CHECK_INTERVAL, so
+        long-running workers also pick up jobs orphaned by workers that died later.
+        """
+        now = time.monotonic()
+        if self._last_recovery and now - self._last_recovery < JOB_STALE_CHECK_INTERVAL:
+            return
+        self._last_recovery = now
+        try:
+            requeue_stale_jobs()
+        except Exception as e:
+            print(f"Job queue recovery error: {e}")
+
+    def _run(self):
+        while True:
+            try:
+                job = claim_next_job()
+            except Exception as e:
+                print(f"Job queue error: {e}")
+                job = None
+            if job is None:
+                self.recover_stale_jobs()
+                self._wakeup.wait(JOB_POLL_INTERVAL)
+                self._wakeup.clear()
+                continue
+            try:
+                result, error = process_job(job)
+            except LLMUnavailableError as unavailable:
+                # Leave the job for later instead of failing it while the provider recovers
+                try:
+                    requeue_job(job['id'])
+                except Exception as e:
+                    print(f"Job queue error: {e}")
+                time.sleep(unavailable.retry_after)
+                continue
+            except Exception as e:
+                result, error = None, f"Unexpected error: {e}"
+            try:
+                finish_job(job['id'], result, error)
+            except Exception as e:
+                print(f"Job queue error: {e}")
+
+job_queue = JobQueue()
+
+def job_to_dict(row):
+    job = {
+        "job_id": row['id'],
+        "batch_id": row['batch_id'],
+        "filename": row['filename'],
+        "status": row['status'],
+        "created_at": row['created_at'],
+        "updated_at": row['updated_at'],
+    }
+    if row['result']:
+        job["analysis"] = json.loads(row['result'])
+    if row['error']:
+        job["error"] = row['error']
+    return job
+
+JOB_COLUMNS = "id, batch_id, filename, status, result, error, created_at, updated_at"
+
 # --- API Endpoints ---
+def llm_unavailable_response(error):
+    headers = {"Retry-After": str(error.retry_after)}
+    return jsonify({"error": "The language model is temporarily unavailable", "retry_after": error.retry_after}), 503, headers
+
+def llm_unavailable_entry(error):
+    return {"error": f"The language model is temporarily unavailable: {error}", "retry_after": error.retry_after}
+
 @app.route('/analyze', methods=['POST'])
 def analyze_resume():
+    if request.values.get('async', '').lower() in ('1', 'true', 'yes'):
+        return submit_analysis_jobs()
     if 'resume' not in request.files:
         return jsonify({"error": "No resume file part"}), 400
     resume_file = request.files['resume']
@@ -131,56 +1871,693 @@ def analyze_resume():
     if not resume_text:
         return jsonify({"error": "Could not extract text from PDF"}), 500
 
-    analysis_result = get_llm_analysis(resume_text, job_description)
+    send_to_llm, analysis_result = prescreen_resumes([resume_text], job_description)[0]
+    if not send_to_llm and PRESCREEN_MODE == 'drop':
+        return jsonify({"skipped": True, "error": "Below the pre-screening cutoff"}), 200
+    try:
+        if send_to_llm:
+            analysis_result = get_cached_llm_analysis(resume_text, job_description)
+        if not analysis_result and llm_circuit_breaker.retry_after():
+            raise LLMUnavailableError("LLM circuit breaker is open", llm_circuit_breaker.retry_after())
+    except LLMUnavailableError as e:
+        return llm_unavailable_response(e)
     if not analysis_result:
         return jsonify({"error": "Failed to get analysis from the language model"}), 500
     
     try:
-        db = get_db_connection()
-        cursor = db.cursor()
-        cursor.execute('''
-            INSERT INTO analyses (filename, job_description, match_score, justification, 
-                                  extracted_skills, extracted_experience, extracted_education, missing_keywords)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            resume_file.filename,
-            job_description,
-            analysis_result.get('match_score'),
-            analysis_result.get('justification'),
-            json.dumps(analysis_result.get('extracted_skills', [])),
-            analysis_result.get('extracted_experience'),
-            analysis_result.get('extracted_education'),
-            json.dumps(analysis_result.get('missing_keywords', []))
-        ))
-        db.commit()
-        db.close()
+        save_analyses([(resume_file.filename, job_description, analysis_result)])
     except Exception as e:
         print(f"Database Error: {e}")
         return jsonify(analysis_result), 200
 
     return jsonify(analysis_result), 200
 
+@app.route('/analyze/batch', methods=['POST'])
+def analyze_resume_batch():
+    """
+    Analyzes many resumes against one job description. PDFs are parsed in
+    parallel and LLM calls fan out with at most LLM_MAX_CONCURRENCY in flight.
+    """
+    resume_files = request.files.getlist('resumes')
+    job_description = request.form.get('job_description', '')
+    if not resume_files or not job_description:
+        return jsonify({"error": "Missing files or job description"}), 400
+    if len(resume_files) > BATCH_MAX_FILES:
+        return jsonify({"error": f"Too many files in one batch (max {BATCH_MAX_FILES})"}), 400
+    try:
+        top_k = int(request.form.get('top_k', PRESCREEN_TOP_K))
+    except ValueError:
+        return jsonify({"error": "top_k must be an integer"}), 400
+    if top_k < 0:
+        return jsonify({"error": "top_k must not be negative (0 sends every resume to the LLM)"}), 400
+
+    filenames = [f.filename for f in resume_files]
+    payloads = [BytesIO(f.read()) for f in resume_files]
+
+    with ThreadPoolExecutor(max_workers=PDF_PARSE_WORKERS) as pool:
+        texts = map_in_context(pool, extract_text_from_pdf, payloads)
+
+    decisions = prescreen_resumes(texts, job_description, top_k=top_k)
+
+    def analyze_text(resume_text, decision):
+        send_to_llm, heuristic_result = decision
+        if not send_to_llm:
+            return heuristic_result
+        try:
+            return get_cached_llm_analysis(resume_text, job_description)
+        except LLMUnavailableError as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY) as pool:
+        analyses = map_in_context(pool, analyze_text, texts, decisions)
+
+    results = []
+    records = []
+    for filename, resume_text, decision, analysis_result in zip(filenames, texts, decisions, analyses):
+        if not resume_text:
+            results.append({"filename": filename, "error": "Could not extract text from PDF"})
+        elif not decision[0] and PRESCREEN_MODE == 'drop':
+            results.append({"filename": filename, "skipped": True, "error": "Below the pre-screening cutoff"})
+        elif isinstance(analysis_result, LLMUnavailableError):
+            results.append({"filename": filename, **llm_unavailable_entry(analysis_result)})
+        elif not analysis_result:
+            results.append({"filename": filename, "error": "Failed to get analysis from the language model"})
+        else:
+            results.append({"filename": filename, "analysis": analysis_result})
+            records.append((filename, job_description, analysis_result))
+
+    if records:
+        try:
+            save_analyses(records)
+        except Exception as e:
+            print(f"Database Error: {e}")
+
+    return jsonify({"results": results}), 200
+
+def parse_roles(form):
+    """
+    Reads the roles for /analyze/roles: either a 'roles' JSON array of strings or
+    {"title", "description"} objects, or repeated 'job_description' fields.
+    Returns a list of (title, job_description) pairs.
+    """
+    if form.get('roles'):
+        entries = json.loads(form['roles'])
+        if not isinstance(entries, list):
+            raise ValueError("roles must be a JSON array")
+    else:
+        entries = form.getlist('job_description')
+    roles = []
+    for i, entry in enumerate(entries):
+        if isinstance(entry, dict):
+            title, description = entry.get('title') or f"Role {i + 1}", entry.get('description', '')
+        else:
+            title, description = f"Role {i + 1}", entry
+        if not isinstance(description, str) or not description.strip():
+            raise ValueError(f"Role {i + 1} has no job description")
+        roles.append((str(title), description))
+    return roles
+
+def role_rank(role):
+    """
+    Sort key for the ranked role list: LLM-scored roles by match score, then
+    pre-screened roles by skill coverage, then roles whose analysis failed.
+    """
+    if 'error' in role:
+        return (0, 0)
+    if role['prescreened']:
+        return (1, role['skill_coverage'])
+    return (2, role['analysis'].get('match_score', 0))
+
+@app.route('/analyze/roles', methods=['POST'])
+def analyze_resume_roles():
+    """
+    Scores one resume against many job descriptions. The PDF is parsed once,
+    roles are pre-screened locally, the best MULTI_MATCH_TOP_K are scored by the
+    LLM in parallel, and all analyses are stored linked to one match run.
+    Pre-screened roles report skill_coverage instead of a match_score and are
+    ranked after every LLM-scored role.
+    """
+    if 'resume' not in request.files or request.files['resume'].filename == '':
+        return jsonify({"error": "No resume file part"}), 400
+    resume_file = request.files['resume']
+    try:
+        roles = parse_roles(request.form)
+        top_k = int(request.form.get('top_k', MULTI_MATCH_TOP_K))
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": f"Invalid roles: {e}"}), 400
+    if not roles:
+        return jsonify({"error": "Missing job descriptions"}), 400
+    if len(roles) > MULTI_MATCH_MAX_ROLES:
+        return jsonify({"error": f"Too many roles (max {MULTI_MATCH_MAX_ROLES})"}), 400
+    if top_k < 0:
+        return jsonify({"error": "top_k must not be negative (0 sends every role to the LLM)"}), 400
+
+    resume_text = extract_text_from_pdf(BytesIO(resume_file.read()))
+    if not resume_text:
+        return jsonify({"error": "Could not extract text from PDF"}), 500
+
+    job_descriptions = [description for _, description in roles]
+    decisions = prescreen_roles(resume_text, job_descriptions, top_k=top_k)
+
+    def analyze_role(job_description, decision):
+        send_to_llm, heuristic_result = decision
+        if not send_to_llm:
+            return heuristic_result
+        try:
+            return get_cached_llm_analysis(resume_text, job_description)
+        except LLMUnavailableError as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY) as pool:
+        analyses = map_in_context(pool, analyze_role, job_descriptions, decisions)
+
+    ranked = []
+    records = []
+    for (title, job_description), decision, analysis_result in zip(roles, decisions, analyses):
+        if not decision[0] and PRESCREEN_MODE == 'drop':
+            continue
+        if isinstance(analysis_result, LLMUnavailableError):
+            ranked.append({"title": title, "prescreened": False, **llm_unavailable_entry(analysis_result)})
+            continue
+        if not analysis_result:
+            ranked.append({"title": title, "prescreened": False, "error": "Failed to get analysis from the language model"})
+            continue
+        records.append((resume_file.filename, job_description, analysis_result))
+        if analysis_result.get('prescreened'):
+            # Skill coverage is not comparable with LLM scores, so it is reported separately
+            analysis = {k: v for k, v in analysis_result.items() if k != 'match_score'}
+            ranked.append({"title": title, "prescreened": True, "skill_coverage": analysis_result['match_score'], "analysis": analysis})
+        else:
+            ranked.append({"title": title, "prescreened": False, "analysis": analysis_result})
+
+    match_run_id = None
+    if records:
+        try:
+            match_run_id, analysis_ids = save_match_run(resume_file.filename, records)
+            analysis_ids = iter(analysis_ids)
+            for role in ranked:
+                if 'analysis' in role:
+                    role['analysis_id'] = next(analysis_ids)
+        except Exception as e:
+            print(f"Database Error: {e}")
+
+    ranked.sort(key=role_rank, reverse=True)
+    return jsonify({"match_run_id": match_run_id, "filename": resume_file.filename, "roles": ranked}), 200
+
+@app.route('/matches/<int:match_run_id>', methods=['GET'])
+def get_match_run(match_run_id):
+    db = get_db_connection()
+    run = db.execute("SELECT * FROM match_runs WHERE id = ?", (match_run_id,)).fetchone()
+    rows = db.execute('''
+        SELECT a.id, a.match_score, a.prescreened, a.justification, a.extracted_skills, a.missing_keywords,
+               a.job_description_id, jd.text AS job_description
+        FROM analyses a JOIN job_descriptions jd ON jd.id = a.job_description_id
+        WHERE a.match_run_id = ?
+        ORDER BY a.prescreened, a.match_score DESC, a.id
+    ''', (match_run_id,)).fetchall()
+    db.close()
+    if not run:
+        return jsonify({"error": "Match run not found"}), 404
+    return jsonify({**dict(run), "roles": [dict(row) for row in rows]}), 200
+
+def submit_analysis_jobs():
+    """
+    Queues every uploaded resume ('resume' or 'resumes' parts) and returns 202
+    with the job ids to poll at /jobs?ids= (or /jobs/<id>), or stream from /jobs/stream.
+    """
+    resume_files = request.files.getlist('resume') + request.files.getlist('resumes')
+    job_description = request.form.get('job_description', '')
+    if not resume_files or not job_description:
+        return jsonify({"error": "Missing file or job description"}), 400
+    if len(resume_files) > BATCH_MAX_FILES:
+        return jsonify({"error": f"Too many files in one batch (max {BATCH_MAX_FILES})"}), 400
+    if any(f.filename == '' for f in resume_files):
+        return jsonify({"error": "Missing file or job description"}), 400
+
+    batch_id, job_ids = enqueue_jobs([(f.filename, f.read()) for f in resume_files], job_description)
+    jobs = [
+        {"job_id": job_id, "filename": f.filename, "status_url": f"/jobs/{job_id}"}
+        for job_id, f in zip(job_ids, resume_files)
+    ]
+    ids = ",".join(str(job_id) for job_id in job_ids)
+    return jsonify({
+        "batch_id": batch_id, "jobs": jobs, "poll_url": f"/jobs?ids={ids}", "stream_url": f"/jobs/stream?ids={ids}"
+    }), 202
+
+@app.route('/jobs/<int:job_id>', methods=['GET'])
+def get_job(job_id):
+    db = get_db_connection()
+    row = db.execute(f"SELECT {JOB_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    db.close()
+    if not row:
+        return jsonify({"error": "Job not found"}), 404
+    if row['status'] not in JOB_FINISHED_STATUSES:
+        job_queue.start()
+    return jsonify(job_to_dict(row)), 200
+
+def parse_job_ids(args):
+    """
+    Reads ?ids=1,2,3. Raises ValueError on malformed or missing ids.
+    """
+    try:
+        job_ids = [int(x) for x in args.get('ids', '').split(',') if x.strip()]
+    except ValueError:
+        raise ValueError("ids must be a comma-separated list of integers")
+    if not job_ids:
+        raise ValueError("No job ids given")
+    if len(job_ids) > BATCH_MAX_FILES:
+        raise ValueError(f"Too many job ids (max {BATCH_MAX_FILES})")
+    return job_ids
+
+@app.route('/jobs', methods=['GET'])
+def get_jobs():
+    """
+    Status of many jobs in one short request, for clients that poll. Pass the
+    ids still pending on each poll to fetch only what is left.
+    """
+    try:
+        job_ids = parse_job_ids(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    placeholders = ",".join("?" * len(job_ids))
+    db = get_db_connection()
+    rows = db.execute(f"SELECT {JOB_COLUMNS} FROM jobs WHERE id IN ({placeholders}) ORDER BY id", job_ids).fetchall()
+    db.close()
+    if any(row['status'] not in JOB_FINISHED_STATUSES for row in rows):
+        job_queue.start()
+    return jsonify({"jobs": [job_to_dict(row) for row in rows]}), 200
+
+@app.route('/jobs/stream', methods=['GET'])
+def stream_jobs():
+    """
+    Server-sent events stream that emits one 'job' event per job as soon as it
+    finishes, then a final 'done' event.
+
+    The stream occupies a worker for as long as it is open (up to
+    JOB_STREAM_TIMEOUT), so only use it when the server runs a threaded or
+    async worker class (e.g. gunicorn --worker-class gthread --threads 8).
+    With the default sync workers, poll GET /jobs?ids= instead.
+    """
+    try:
+        job_ids = parse_job_ids(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    job_queue.start()
+
+    def events():
+        pending = set(job_ids)
+        deadline = time.time() + JOB_STREAM_TIMEOUT
+        placeholders = ",".join("?" * len(job_ids))
+        while pending and time.time() < deadline:
+            db = get_db_connection()
+            rows = db.execute(
+                f"SELECT {JOB_COLUMNS} FROM jobs WHERE id IN ({placeholders}) AND status IN ('done', 'failed')",
+                job_ids
+            ).fetchall()
+            db.close()
+            for row in rows:
+                if row['id'] in pending:
+                    pending.discard(row['id'])
+                    yield f"event: job\ndata: {json.dumps(job_to_dict(row))}\n\n"
+            if pending:
+                yield ": keep-alive\n\n"
+                time.sleep(JOB_POLL_INTERVAL)
+        yield f"event: done\ndata: {json.dumps({'pending': sorted(pending)})}\n\n"
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(events(), mimetype='text/event-stream', headers=headers)
+
+ANALYSIS_COLUMNS = (
+    'id', 'filename', 'job_description_id', 'match_score', 'justification', 'extracted_skills',
+    'extracted_experience', 'extracted_education', 'missing_keywords', 'analysis_date', 'match_run_id',
+    'prescreened'
+)
+
+def fetch_job_descriptions(db, job_description_ids):
+    ids = sorted(set(job_description_ids))
+    if not ids:
+        return {}
+    placeholders = ",".join("?" * len(ids))
+    rows = db.execute(f"SELECT id, text FROM job_descriptions WHERE id IN ({placeholders})", ids).fetchall()
+    return {str(row['id']): row['text'] for row in rows}
+
+def encode_cursor(row):
+    raw = json.dumps([row['analysis_date'], row['id']])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    analysis_date, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    return analysis_date, int(row_id)
+
+def parse_fields(args):
+    """
+    Returns the columns selected by ?fields (id and analysis_date are always
+    included) and whether job description texts were requested.
+    Raises ValueError on unknown fields.
+    """
+    fields = [f.strip() for f in args.get('fields', '').split(',') if f.strip()]
+    include_job_descriptions = not fields or 'job_description' in fields
+    fields = ['job_description_id' if f == 'job_description' else f for f in fields]
+    unknown = [f for f in fields if f not in ANALYSIS_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    columns = list(dict.fromkeys(['id', 'analysis_date'] + fields)) if fields else list(ANALYSIS_COLUMNS)
+    return columns, include_job_descriptions
+
+def build_resume_filters(args):
+    """
+    Translates /resumes query parameters into SQL conditions and bound parameters.
+    Raises ValueError on malformed input.
+    """
+    conditions = []
+    params = []
+    if args.get('min_score'):
+        conditions.append("match_score >= ?")
+        params.append(int(args['min_score']))
+    if args.get('max_score'):
+        conditions.append("match_score <= ?")
+        params.append(int(args['max_score']))
+    if args.get('since'):
+        conditions.append("analysis_date >= ?")
+        params.append(args['since'])
+    if args.get('until'):
+        conditions.append("analysis_date <= ?")
+        params.append(args['until'])
+    if args.get('filename'):
+        conditions.append("filename LIKE ? ESCAPE '\\'")
+        escaped = args['filename'].replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        params.append(f"%{escaped}%")
+    if args.get('prescreened') in ('true', 'false'):
+        conditions.append("prescreened = ?")
+        params.append(1 if args['prescreened'] == 'true' else 0)
+    elif args.get('prescreened'):
+        raise ValueError("prescreened must be 'true' or 'false'")
+    if args.get('skill'):
+        conditions.append("id IN (SELECT analysis_id FROM analysis_skills WHERE skill = ? AND kind = 'extracted')")
+        params.append(normalize_skill(args['skill']))
+    return conditions, params
+
 @app.route('/resumes', methods=['GET'])
 def get_all_resumes():
+    """
+    Keyset-paginated talent pool, newest first. Supports ?limit, ?cursor (from the
+    previous page's next_cursor), ?fields (comma-separated columns) and the
+    min_score, max_score, since, until, filename, skill and prescreened filters.
+    prescreened is 1 for rows scored by the local pre-screen, whose match_score
+    is a skill-coverage percentage rather than an LLM score.
+    Rows carry a job_description_id; the texts of the job descriptions used on
+    the page are returned once in the top-level job_descriptions map.
+    """
+    try:
+        limit = min(int(request.args.get('limit', RESUMES_DEFAULT_LIMIT)), RESUMES_MAX_LIMIT)
+        if limit < 1:
+            raise ValueError("limit must be positive")
+        columns, include_job_descriptions = parse_fields(request.args)
+        conditions, params = build_resume_filters(request.args)
+        if request.args.get('cursor'):
+            analysis_date, row_id = decode_cursor(request.args['cursor'])
+            conditions.append("(analysis_date < ? OR (analysis_date = ? AND id < ?))")
+            params.extend([analysis_date, analysis_date, row_id])
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": f"Invalid query: {e}"}), 400
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = f"SELECT {', '.join(columns)} FROM analyses {where} ORDER BY analysis_date DESC, id DESC LIMIT ?"
     try:
         db = get_db_connection()
-        cursor = db.cursor()
-        cursor.execute("SELECT * FROM analyses ORDER BY analysis_date DESC")
-        analyses = cursor.fetchall()
+        rows = db.execute(query, params + [limit + 1]).fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        job_descriptions = {}
+        if include_job_descriptions:
+            job_descriptions = fetch_job_descriptions(db, [row['job_description_id'] for row in rows])
         db.close()
-        return jsonify([dict(row) for row in analyses])
     except Exception as e:
         return jsonify({"error": f"Database fetch error: {e}"}), 500
 
-# This is called before the first request to the application
+    response = {
+        "items": [dict(row) for row in rows],
+        "next_cursor": encode_cursor(rows[-1]) if has_more else None,
+    }
+    if include_job_descriptions:
+        response["job_descriptions"] = job_descriptions
+    return jsonify(response)
+
+@app.route('/resumes/sync', methods=['GET'])
+def sync_resumes():
+    """
+    Incremental sync for client-side caches: returns analyses with id greater
+    than ?since_id (and, optionally, analysis_date after ?since), oldest first.
+    Analyses are append-only, so passing back last_id until has_more is false
+    yields every new row exactly once. Supports ?fields and ?limit like /resumes.
+    """
+    try:
+        since_id = int(request.args.get('since_id', 0))
+        limit = min(int(request.args.get('limit', SYNC_DEFAULT_LIMIT)), SYNC_MAX_LIMIT)
+        if limit < 1:
+            raise ValueError("limit must be positive")
+        columns, include_job_descriptions = parse_fields(request.args)
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": f"Invalid query: {e}"}), 400
+
+    conditions = ["id > ?"]
+    params = [since_id]
+    if request.args.get('since'):
+        conditions.append("analysis_date > ?")
+        params.append(request.args['since'])
+    query = f"SELECT {', '.join(columns)} FROM analyses WHERE {' AND '.join(conditions)} ORDER BY id LIMIT ?"
+    try:
+        db = get_db_connection()
+        rows = db.execute(query, params + [limit + 1]).fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        job_descriptions = {}
+        if include_job_descriptions:
+            job_descriptions = fetch_job_descriptions(db, [row['job_description_id'] for row in rows])
+        db.close()
+    except Exception as e:
+        return jsonify({"error": f"Database fetch error: {e}"}), 500
+
+    response = {
+        "items": [dict(row) for row in rows],
+        "last_id": rows[-1]['id'] if rows else since_id,
+        "has_more": has_more,
+    }
+    if include_job_descriptions:
+        response["job_descriptions"] = job_descriptions
+    return jsonify(response)
+
+EXPORT_SKILL_COLUMNS = ('analysis_id', 'filename', 'match_score', 'prescreened', 'analysis_date', 'kind', 'skill')
+JSON_LIST_COLUMNS = ('extracted_skills', 'missing_keywords')
+
+def iter_export_chunks(explode_skills, since_id):
+    """
+    Yields (columns, rows) chunks of at most EXPORT_CHUNK_ROWS rows, reading the
+    table incrementally so memory stays flat however large the pool is.
+    """
+    db = get_db_connection()
+    try:
+        if explode_skills:
+            columns = EXPORT_SKILL_COLUMNS
+            cursor = db.execute('''
+                SELECT s.analysis_id, a.filename, a.match_score, a.prescreened, a.analysis_date, s.kind, s.skill
+                FROM analysis_skills s JOIN analyses a ON a.id = s.analysis_id
+                WHERE s.analysis_id > ?
+                ORDER BY s.analysis_id, s.kind, s.skill
+            ''', (since_id,))
+        else:
+            columns = ANALYSIS_COLUMNS
+            cursor = db.execute(
+                f"SELECT {', '.join(columns)} FROM analyses WHERE id > ? ORDER BY id", (since_id,)
+            )
+        while True:
+            rows = cursor.fetchmany(EXPORT_CHUNK_ROWS)
+            if not rows:
+                return
+            chunk = []
+            for row in rows:
+                values = list(row)
+                if not explode_skills:
+                    for name in JSON_LIST_COLUMNS:
+                        index = columns.index(name)
+                        values[index] = json.loads(values[index] or '[]')
+                chunk.append(values)
+            yield columns, chunk
+    finally:
+        db.close()
+
+def encode_csv_chunks(chunks):
+    header_written = False
+    for columns, rows in chunks:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if not header_written:
+            writer.writerow(columns)
+            header_written = True
+        for values in rows:
+            writer.writerow(["; ".join(v) if isinstance(v, list) else v for v in values])
+        yield buffer.getvalue().encode('utf-8')
+
+def encode_columnar_chunks(chunks):
+    """
+    One JSON line per chunk with column-oriented arrays, the layout analytics
+    tools load fastest (pandas.DataFrame(chunk["data"]) per line).
+    """
+    for columns, rows in chunks:
+        data = {name: [values[i] for values in rows] for i, name in enumerate(columns)}
+        yield (json.dumps({"columns": list(columns), "rows": len(rows), "data": data}) + "\n").encode('utf-8')
+
+def gzip_stream(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+EXPORT_FORMATS = {
+    "csv": (encode_csv_chunks, "csv"),
+    "columnar": (encode_columnar_chunks, "jsonl"),
+}
+
+@app.route('/export', methods=['GET'])
+def export_analyses():
+    """
+    Streams the analyses table as gzip-compressed CSV (?format=csv) or
+    column-oriented JSON lines (?format=columnar). ?explode=skills exports one
+    row per (analysis, skill) from the normalized skill table instead, and
+    ?since_id limits the export to newer analyses.
+    """
+    export_format = request.args.get('format', 'csv')
+    explode = request.args.get('explode', '')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    if explode not in ('', 'skills'):
+        return jsonify({"error": "explode must be 'skills'"}), 400
+    try:
+        since_id = int(request.args.get('since_id', 0))
+    except ValueError:
+        return jsonify({"error": "since_id must be an integer"}), 400
+
+    encoder, extension = EXPORT_FORMATS[export_format]
+    chunks = iter_export_chunks(explode == 'skills', since_id)
+    filename = f"{'analysis_skills' if explode else 'analyses'}.{extension}.gz"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    return Response(gzip_stream(encoder(chunks)), mimetype='application/gzip', headers=headers)
+
+@app.route('/search', methods=['GET'])
+def search_analyses():
+    """
+    Searches stored analyses. ?skills=a,b matches the normalized skill table
+    (mode=all requires every skill, mode=any at least one); ?q= is an FTS5 query
+    over justification, experience, education and skills (supports AND/OR/NOT,
+    "phrases" and prefix*). Both may be combined. Results are ranked by skills
+    matched, then full-text relevance, then match score.
+    """
+    skills = [normalize_skill(s) for s in request.args.get('skills', '').split(',') if s.strip()]
+    text_query = request.args.get('q', '').strip()
+    mode = request.args.get('mode', 'all')
+    try:
+        limit = min(int(request.args.get('limit', RESUMES_DEFAULT_LIMIT)), SEARCH_MAX_LIMIT)
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except ValueError:
+        return jsonify({"error": "limit and offset must be integers"}), 400
+    if mode not in ('all', 'any'):
+        return jsonify({"error": "mode must be 'all' or 'any'"}), 400
+    if not skills and not text_query:
+        return jsonify({"error": "Provide skills and/or q"}), 400
+    if text_query and not FTS5_AVAILABLE:
+        return jsonify({"error": "Full-text search is not available on this SQLite build"}), 501
+
+    ctes = []
+    joins = []
+    params = []
+    order = []
+    if skills:
+        placeholders = ",".join("?" * len(skills))
+        required = len(set(skills)) if mode == 'all' else 1
+        ctes.append(f'''skill_hits AS (
+            SELECT analysis_id, COUNT(DISTINCT skill) AS skills_matched
+            FROM analysis_skills
+            WHERE kind = 'extracted' AND skill IN ({placeholders})
+            GROUP BY analysis_id
+            HAVING COUNT(DISTINCT skill) >= ?
+        )''')
+        params.extend(skills + [required])
+        joins.append("JOIN skill_hits ON skill_hits.analysis_id = a.id")
+        order.append("skill_hits.skills_matched DESC")
+    if text_query:
+        ctes.append('''text_hits AS (
+            SELECT rowid AS analysis_id, bm25(analyses_fts) AS text_rank
+            FROM analyses_fts WHERE analyses_fts MATCH ?
+        )''')
+        params.append(text_query)
+        joins.append("JOIN text_hits ON text_hits.analysis_id = a.id")
+        order.append("text_hits.text_rank")
+    # LLM scores rank above pre-screen skill coverage at equal relevance
+    order.extend(["a.prescreened", "a.match_score DESC"])
+
+    extra_columns = "".join([
+        ", skill_hits.skills_matched" if skills else "",
+        ", text_hits.text_rank" if text_query else "",
+    ])
+    query = f'''
+        WITH {", ".join(ctes)}
+        SELECT a.id, a.filename, a.match_score, a.prescreened, a.analysis_date, a.extracted_skills{extra_columns}
+        FROM analyses a {" ".join(joins)}
+        ORDER BY {", ".join(order)}
+        LIMIT ? OFFSET ?
+    '''
+    try:
+        db = get_db_connection()
+        rows = db.execute(query, params + [limit, offset]).fetchall()
+        db.close()
+    except sqlite3.OperationalError as e:
+        return jsonify({"error": f"Invalid search query: {e}"}), 400
+    except Exception as e:
+        return jsonify({"error": f"Database fetch error: {e}"}), 500
+
+    items = []
+    for row in rows:
+        item = dict(row)
+        item['extracted_skills'] = json.loads(item['extracted_skills'] or '[]')
+        items.append(item)
+    return jsonify({"items": items, "limit": limit, "offset": offset})
+
+@app.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify(analysis_cache.stats())
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+# Runs the schema migrations once per worker process; later requests only check a flag
 @app.before_request
 def before_first_request_func():
-    init_db()
+    g.request_start = time.perf_counter()
+    _request_stage_timings.set({})
+    ensure_db_initialized()
+
+@app.after_request
+def record_request_metrics(response):
+    if 'request_start' not in g:
+        return response
+    elapsed = time.perf_counter() - g.request_start
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    REQUEST_DURATION.observe(elapsed, endpoint=endpoint, method=request.method, status=response.status_code)
+    if METRICS_TIMING_HEADERS:
+        timings = dict(_request_stage_timings.get() or {}, total=elapsed)
+        response.headers['Server-Timing'] = ", ".join(
+            f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()
+        )
+    return response
 
 
 # --- Main execution block for local testing ---
 if __name__ == '__main__':
     # When you run "python api.py", this block runs the test server.
     # Gunicorn ignores this block and just uses the 'app' object.
+    ensure_db_initialized()
     app.run(host='0.0.0.0', port=5000, debug=True)
     
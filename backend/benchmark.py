@@ -0,0 +1,323 @@
+"""
+End-to-end benchmark for the /analyze pipeline.
+
+Drives the Flask app through its test client against the fake LLM provider,
+using a corpus of synthetic PDFs with varying page counts, and reports:
+  - p50/p95/p99 latency and throughput at each concurrency level
+  - per-stage latency (PDF parse, prompt compaction and build, LLM call, SQLite insert)
+  - peak memory per stage (PDF parse, prompt build, LLM call, JSON decode, SQLite insert)
+
+Usage:
+    python benchmark.py --output bench.json
+    python benchmark.py --baseline bench.json --max-regression 0.15
+
+With --baseline, exits with status 1 if p95 latency or throughput at any
+concurrency level is more than --max-regression worse than the baseline.
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import tempfile
+import threading
+import tracemalloc
+from io import BytesIO
+from contextlib import redirect_stdout
+
+# The benchmark must never reach the network, and every resume should reach
+# the (fake) LLM so the full pipeline is measured. The provider quota does not
+# apply to the fake backend, so the rate limiter is off unless set explicitly.
+os.environ["LLM_PROVIDER"] = "fake"
+os.environ.setdefault("PRESCREEN_MIN_SCORE", "0")
+os.environ.setdefault("LLM_RATE_LIMIT_RPM", "0")
+
+import api
+from tests.helpers import build_pdf
+
+JOB_DESCRIPTION = (
+    "**Role:** Backend Developer\n\n"
+    "**Description:** Build server-side logic and databases.\n\n"
+    "**Key Skills:**\n- Python\n- SQL\n- APIs\n- Flask\n- Docker\n- Kubernetes"
+)
+WORDS = (
+    "python sql flask django docker kubernetes aws linux git react javascript java api rest "
+    "microservices postgres redis kafka terraform led built designed delivered improved team "
+    "project platform service pipeline latency throughput customers data analytics model"
+).split()
+LINES_PER_PAGE = 45
+STAGES = ("extract_pdf", "build_prompt", "llm_call", "json_decode", "db_insert")
+
+
+# --- Synthetic corpus ---
+def build_corpus(page_counts, per_size, seed):
+    rng = random.Random(seed)
+    corpus = []
+    for page_count in page_counts:
+        for n in range(per_size):
+            pages = [
+                [" ".join(rng.choice(WORDS) for _ in range(12)) for _ in range(LINES_PER_PAGE)]
+                for _ in range(page_count)
+            ]
+            pages[0][0] = f"Candidate {page_count}-{n} resume"
+            corpus.append((f"synthetic_{page_count}p_{n}.pdf", page_count, build_pdf(pages)))
+    return corpus
+
+
+# --- Statistics ---
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    # Nearest-rank method
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+def summarize_ms(seconds):
+    millis = [s * 1000 for s in seconds]
+    return {
+        "count": len(millis),
+        "p50": round(percentile(millis, 50), 3) if millis else None,
+        "p95": round(percentile(millis, 95), 3) if millis else None,
+        "p99": round(percentile(millis, 99), 3) if millis else None,
+        "mean": round(sum(millis) / len(millis), 3) if millis else None,
+    }
+
+
+# --- Instrumentation ---
+class StageTimer:
+    """
+    Wraps api functions so every call records its duration under a stage name.
+    """
+    def __init__(self):
+        self.samples = {}
+        self._lock = threading.Lock()
+        self._originals = []
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self.samples.setdefault(stage, []).append(seconds)
+
+    def wrap(self, owner, attribute, stage):
+        original = getattr(owner, attribute)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - start)
+
+        setattr(owner, attribute, timed)
+        self._originals.append((owner, attribute, original))
+
+    def restore(self):
+        for owner, attribute, original in reversed(self._originals):
+            setattr(owner, attribute, original)
+        self._originals = []
+
+    def reset(self):
+        with self._lock:
+            self.samples = {}
+
+
+def disable_caches():
+    """
+    Makes every request pay for PDF parsing and the LLM call.
+    """
+    api.analysis_cache = api.AnalysisCache(max_entries=0, ttl_seconds=0)
+    api.get_cached_pdf_text = lambda file_hash: None
+
+
+# --- Benchmark phases ---
+def profile_stage_memory(corpus):
+    """
+    Runs each stage sequentially under tracemalloc and records its peak
+    allocation, taking the worst case across the corpus.
+    """
+    provider = api.get_llm_provider()
+    peaks = {stage: 0 for stage in STAGES}
+
+    def measure(stage, func, *args):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        result = func(*args)
+        peaks[stage] = max(peaks[stage], tracemalloc.get_traced_memory()[1] - before)
+        return result
+
+    tracemalloc.start()
+    try:
+        for filename, _, pdf_bytes in corpus:
+            text = measure("extract_pdf", api.extract_text_from_pdf, BytesIO(pdf_bytes))
+            prompt = measure("build_prompt", api.build_compact_prompt, text, JOB_DESCRIPTION)
+            raw = measure("llm_call", provider.generate, prompt)
+            analysis = measure("json_decode", json.loads, raw)
+            measure("db_insert", api.save_analyses, [(filename, JOB_DESCRIPTION, analysis)])
+    finally:
+        tracemalloc.stop()
+    return {stage: round(peak / 1024, 1) for stage, peak in peaks.items()}
+
+def run_load(corpus, concurrency, total_requests):
+    """
+    Sends total_requests POST /analyze calls from `concurrency` threads, each
+    with its own test client, cycling through the corpus.
+    """
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    counter = iter(range(total_requests))
+
+    def client_loop():
+        client = api.app.test_client()
+        while True:
+            with lock:
+                n = next(counter, None)
+            if n is None:
+                return
+            filename, _, pdf_bytes = corpus[n % len(corpus)]
+            start = time.perf_counter()
+            response = client.post('/analyze', data={
+                'job_description': JOB_DESCRIPTION,
+                'resume': (BytesIO(pdf_bytes), filename),
+            })
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if response.status_code != 200:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=client_loop) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "errors": errors[0],
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(total_requests / wall, 3) if wall else None,
+        "latency_ms": summarize_ms(latencies),
+    }
+
+def compare_to_baseline(results, baseline, max_regression):
+    """
+    Returns a list of human-readable regressions beyond the allowed fraction.
+    """
+    regressions = []
+    previous = {run["concurrency"]: run for run in baseline.get("load", [])}
+    for run in results["load"]:
+        old = previous.get(run["concurrency"])
+        if not old:
+            continue
+        old_p95, new_p95 = old["latency_ms"]["p95"], run["latency_ms"]["p95"]
+        if old_p95 and new_p95 > old_p95 * (1 + max_regression):
+            regressions.append(f"c={run['concurrency']}: p95 latency {old_p95}ms -> {new_p95}ms")
+        old_rps, new_rps = old["throughput_rps"], run["throughput_rps"]
+        if old_rps and new_rps < old_rps * (1 - max_regression):
+            regressions.append(f"c={run['concurrency']}: throughput {old_rps} -> {new_rps} req/s")
+    return regressions
+
+def run_benchmark(args):
+    """
+    Sets up an isolated database and fake provider, then runs the memory pass
+    and one load phase per concurrency level.
+    """
+    workdir = tempfile.mkdtemp(prefix="smartresume-bench-")
+    api.DATABASE = os.path.join(workdir, "bench.db")
+    api._llm_provider = api.FakeProvider(
+        latency_ms=args.llm_latency_ms, jitter_ms=args.llm_jitter_ms, failure_rate=0.0, seed=args.seed
+    )
+    if not args.with_cache:
+        disable_caches()
+    api.ensure_db_initialized()
+
+    corpus = build_corpus(args.pages, args.per_size, args.seed)
+    memory = profile_stage_memory(corpus)
+
+    timer = StageTimer()
+    timer.wrap(api, "extract_text_from_pdf", "extract_pdf")
+    timer.wrap(api, "build_compact_prompt", "build_prompt")
+    timer.wrap(api._llm_provider, "generate", "llm_call")
+    timer.wrap(api, "save_analyses", "db_insert")
+
+    load = []
+    stages = {}
+    try:
+        for concurrency in args.concurrency:
+            timer.reset()
+            load.append(run_load(corpus, concurrency, args.requests))
+            stages[str(concurrency)] = {stage: summarize_ms(s) for stage, s in timer.samples.items()}
+    finally:
+        timer.restore()
+
+    return corpus, memory, load, stages
+
+def parse_int_list(value):
+    return [int(x) for x in value.split(',') if x.strip()]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the /analyze pipeline against a fake LLM.")
+    parser.add_argument("--pages", type=parse_int_list, default=[1, 3, 10, 30],
+                        help="comma-separated page counts for the synthetic corpus")
+    parser.add_argument("--per-size", type=int, default=5, help="PDFs generated per page count")
+    parser.add_argument("--concurrency", type=parse_int_list, default=[1, 4, 16],
+                        help="comma-separated concurrent client counts")
+    parser.add_argument("--requests", type=int, default=100, help="requests per concurrency level")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0, help="fake LLM mean latency")
+    parser.add_argument("--llm-jitter-ms", type=float, default=10.0, help="fake LLM latency std-dev")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--with-cache", action="store_true",
+                        help="keep the PDF text and analysis caches enabled")
+    parser.add_argument("--output", help="write results JSON to this file (default: stdout)")
+    parser.add_argument("--baseline", help="results JSON from a previous run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.15,
+                        help="allowed fractional regression versus the baseline")
+    args = parser.parse_args(argv)
+
+    # api logs with print(); keep stdout clean for the JSON results
+    with redirect_stdout(sys.stderr):
+        corpus, memory, load, stages = run_benchmark(args)
+
+    results = {
+        "config": {
+            "pages": args.pages,
+            "per_size": args.per_size,
+            "corpus_bytes": sum(len(pdf) for _, _, pdf in corpus),
+            "requests": args.requests,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_jitter_ms": args.llm_jitter_ms,
+            "with_cache": args.with_cache,
+            "seed": args.seed,
+        },
+        "load": load,
+        "stage_latency_ms": stages,
+        "stage_peak_memory_kib": memory,
+    }
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(results, json.load(f), args.max_regression)
+        if regressions:
+            print("Performance regressions beyond threshold:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            return 1
+        print("No regressions beyond threshold.", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+# The API module configures its LLM provider at import time, so the offline
+# fake provider must be selected before any test imports it.
+os.environ.setdefault("LLM_PROVIDER", "fake")
+os.environ.setdefault("FAKE_LLM_LATENCY_MS", "0")
+os.environ.setdefault("FAKE_LLM_JITTER_MS", "0")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """Points the API at an empty SQLite database; migrations have not run yet."""
+    import api
+    monkeypatch.setattr(api, "DATABASE", str(tmp_path / "resumes.db"))
+    monkeypatch.setattr(api, "_db_initialized", False)
+    # Queue worker threads would outlive the test and race it for jobs
+    monkeypatch.setattr(api, "job_queue", api.JobQueue(num_workers=0))
+    return api.DATABASE
+
+
+@pytest.fixture
+def api_client(database):
+    """A Flask test client backed by a fresh, fully migrated database."""
+    import api
+    api.ensure_db_initialized()
+    return api.app.test_client()
@@ -0,0 +1,71 @@
+import time
+
+import api
+from api import AnalysisCache
+
+RESULT = {"match_score": 64, "justification": "Cached.", "extracted_skills": ["Python"], "missing_keywords": []}
+
+
+def cache_rows():
+    db = api.get_db_connection()
+    keys = [row['cache_key'] for row in db.execute("SELECT cache_key FROM analysis_cache ORDER BY created_at")]
+    db.close()
+    return keys
+
+
+def test_key_depends_on_prompt_version_and_normalizes_job_description():
+    key = AnalysisCache.make_key("resume", "Backend  Developer")
+    assert key == AnalysisCache.make_key("resume", "backend developer")
+    assert key != AnalysisCache.make_key("resume", "Backend Developer", prompt="other-template:c1:4000:1500")
+    assert key != AnalysisCache.make_key("resume", "Backend Developer", model="other-model")
+    assert str(api.PROMPT_RESUME_TOKEN_BUDGET) in api.PROMPT_FINGERPRINT
+
+
+def test_results_survive_a_new_process_through_sqlite(api_client):
+    key = AnalysisCache.make_key("resume", "Backend developer")
+    AnalysisCache().set(key, RESULT)
+
+    fresh = AnalysisCache()
+    assert fresh.get(key) == RESULT
+    assert fresh.stats()["hits"] == 1
+
+
+def test_expired_entries_are_misses(api_client):
+    cache = AnalysisCache(ttl_seconds=0)
+    key = AnalysisCache.make_key("resume", "Backend developer")
+    cache.set(key, RESULT)
+    assert cache.get(key) is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_memory_layer_evicts_least_recently_used(api_client):
+    cache = AnalysisCache(max_entries=2)
+    for key in ("a", "b"):
+        cache.set(key, RESULT)
+    cache.get("a")
+    cache.set("c", RESULT)
+    assert list(cache._entries) == ["a", "c"]
+
+
+def test_prune_drops_expired_and_oldest_rows(api_client):
+    db = api.get_db_connection()
+    with db:
+        for i, age in enumerate([10_000, 30, 20, 10]):
+            db.execute(
+                "INSERT INTO analysis_cache (cache_key, model, result, created_at) VALUES (?, 'm', '{}', ?)",
+                (f"k{i}", time.time() - age)
+            )
+        api.prune_analysis_cache(db, ttl_seconds=3600, max_entries=2)
+    db.close()
+    assert cache_rows() == ["k2", "k3"]
+
+
+def test_set_prunes_the_table_periodically(api_client, monkeypatch):
+    monkeypatch.setattr(api, "CACHE_PRUNE_EVERY", 3)
+    monkeypatch.setattr(api, "prune_analysis_cache", lambda db, ttl: db.execute("DELETE FROM analysis_cache"))
+    cache = AnalysisCache()
+    for key in ("a", "b"):
+        cache.set(key, RESULT)
+    assert len(cache_rows()) == 2
+    cache.set("c", RESULT)
+    assert cache_rows() == []
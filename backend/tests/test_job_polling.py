@@ -0,0 +1,63 @@
+import time
+
+import api
+
+
+def test_jobs_endpoint_reports_status_of_many_jobs(api_client):
+    _, job_ids = api.enqueue_jobs([("a.pdf", b"%PDF"), ("b.pdf", b"%PDF")], "Backend developer")
+    api.finish_job(job_ids[0], {"match_score": 60}, None)
+
+    jobs = api_client.get(f"/jobs?ids={job_ids[0]},{job_ids[1]}").json['jobs']
+    assert [(job['job_id'], job['status']) for job in jobs] == [(job_ids[0], 'done'), (job_ids[1], 'queued')]
+    assert jobs[0]['analysis'] == {"match_score": 60}
+
+
+def test_jobs_endpoint_validates_ids(api_client):
+    assert api_client.get('/jobs').status_code == 400
+    assert api_client.get('/jobs?ids=1,x').status_code == 400
+    too_many = ",".join(str(i) for i in range(api.BATCH_MAX_FILES + 1))
+    assert api_client.get(f'/jobs?ids={too_many}').status_code == 400
+
+
+def make_stale(job_id, attempts):
+    db = api.get_db_connection()
+    with db:
+        db.execute(
+            "UPDATE jobs SET status = 'running', attempts = ?, updated_at = ? WHERE id = ?",
+            (attempts, time.time() - api.JOB_STALE_SECONDS - 1, job_id)
+        )
+    db.close()
+
+
+def job_status(job_id):
+    db = api.get_db_connection()
+    row = db.execute("SELECT status, error FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    db.close()
+    return row['status'], row['error']
+
+
+def test_stale_jobs_are_requeued_until_attempts_run_out(api_client):
+    _, (retry_id, exhausted_id) = api.enqueue_jobs([("a.pdf", b"%PDF"), ("b.pdf", b"%PDF")], "Backend developer")
+    make_stale(retry_id, attempts=1)
+    make_stale(exhausted_id, attempts=api.JOB_MAX_ATTEMPTS)
+
+    api.requeue_stale_jobs()
+
+    assert job_status(retry_id) == ('queued', None)
+    status, error = job_status(exhausted_id)
+    assert status == 'failed'
+    assert "too many times" in error
+
+
+def test_running_queue_rechecks_for_stale_jobs_periodically(api_client, monkeypatch):
+    calls = []
+    monkeypatch.setattr(api, "requeue_stale_jobs", lambda: calls.append(1))
+    monkeypatch.setattr(api, "JOB_STALE_CHECK_INTERVAL", 0.05)
+    queue = api.JobQueue(num_workers=0)
+
+    queue.recover_stale_jobs()
+    queue.recover_stale_jobs()
+    assert len(calls) == 1
+    time.sleep(0.06)
+    queue.recover_stale_jobs()
+    assert len(calls) == 2
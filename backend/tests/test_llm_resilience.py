@@ -0,0 +1,224 @@
+import io
+import json
+import time
+
+import pytest
+from google.api_core.exceptions import (
+    DeadlineExceeded, InvalidArgument, PermissionDenied, ResourceExhausted, ServiceUnavailable,
+)
+
+import api
+from api import CircuitBreaker, LLMUnavailableError, TokenBucket, repair_json
+from helpers import build_pdf
+
+VALID_RESPONSE = json.dumps({
+    "match_score": 75,
+    "justification": "Good fit.",
+    "extracted_skills": ["Python"],
+    "extracted_experience": "3 years",
+    "extracted_education": "B.Sc.",
+    "missing_keywords": [],
+})
+
+
+class ScriptedProvider:
+    """Returns (or raises) the scripted responses in order."""
+    name = "scripted"
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def generate(self, prompt):
+        self.calls += 1
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    """Fresh resilience state with no backoff sleeps; returns a provider installer."""
+    monkeypatch.setattr(api, "llm_circuit_breaker", CircuitBreaker(failure_threshold=3, reset_seconds=60))
+    monkeypatch.setattr(api, "llm_rate_limiter", None)
+    monkeypatch.setattr(api, "backoff_delay", lambda attempt: 0)
+    monkeypatch.setattr(api, "LLM_MAX_RETRIES", 2)
+
+    def install(*responses):
+        provider = ScriptedProvider(*responses)
+        monkeypatch.setattr(api, "get_llm_provider", lambda: provider)
+        return provider
+    return install
+
+
+# --- TokenBucket ---
+def test_token_bucket_allows_burst_then_rejects():
+    bucket = TokenBucket(rate=0.001, capacity=2)
+    assert bucket.acquire(timeout=0)
+    assert bucket.acquire(timeout=0)
+    assert not bucket.acquire(timeout=0)
+
+
+def test_token_bucket_refills_over_time():
+    bucket = TokenBucket(rate=50, capacity=1)
+    assert bucket.acquire(timeout=0)
+    started = time.monotonic()
+    assert bucket.acquire(timeout=1)
+    assert 0.01 <= time.monotonic() - started < 0.5
+
+
+# --- CircuitBreaker ---
+def test_circuit_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+    assert 0 < breaker.retry_after() <= 60
+
+
+def test_circuit_breaker_half_open_allows_one_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_failure()
+    assert not breaker.allow()
+    time.sleep(0.02)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.allow()
+    assert breaker.retry_after() == 0
+
+
+def test_circuit_breaker_cancel_trial_frees_the_slot():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.allow()
+    breaker.cancel_trial()
+    assert breaker.allow()
+
+
+# --- repair_json ---
+@pytest.mark.parametrize("text", [
+    '```json\n{"match_score": 70}\n```',
+    'Here is the analysis: {"match_score": 70} Hope this helps!',
+    '{"match_score": 70, "extracted_skills": ["Python",],}',
+    "{'match_score': 70, 'prescreened': False}",
+    '{"match_score": 70, "extracted_skills": ["Python", "SQ',
+    '{"match_score": 70, “justification”: "ok"}',
+])
+def test_repair_json_recovers_common_malformations(text):
+    assert repair_json(text)["match_score"] == 70
+
+
+@pytest.mark.parametrize("text", [None, "", "no json here", "[1, 2, 3]"])
+def test_repair_json_returns_none_when_unrecoverable(text):
+    assert repair_json(text) is None
+
+
+# --- call_llm ---
+def test_call_llm_retries_provider_errors(llm):
+    provider = llm(ServiceUnavailable("503 from provider"), VALID_RESPONSE)
+    assert api.call_llm("prompt")["match_score"] == 75
+    assert provider.calls == 2
+
+
+def test_call_llm_retries_invalid_json(llm):
+    provider = llm("not json at all", VALID_RESPONSE)
+    assert api.call_llm("prompt")["match_score"] == 75
+    assert provider.calls == 2
+
+
+def test_call_llm_raises_last_error_when_retries_are_exhausted(llm):
+    provider = llm(ServiceUnavailable("one"), DeadlineExceeded("two"), ConnectionError("three"))
+    with pytest.raises(ConnectionError, match="three"):
+        api.call_llm("prompt")
+    assert provider.calls == 3
+
+
+def test_call_llm_stops_when_the_breaker_opens(llm):
+    provider = llm(*[ResourceExhausted("quota")] * 3)
+    api.llm_circuit_breaker.failure_threshold = 2
+    with pytest.raises(LLMUnavailableError):
+        api.call_llm("prompt")
+    assert provider.calls == 2
+
+
+@pytest.mark.parametrize("error", [
+    InvalidArgument("400 request payload size exceeds the limit"),
+    PermissionDenied("403 API key not valid"),
+    ValueError("response.text: the response was blocked by safety filters"),
+])
+def test_call_llm_fails_permanent_errors_without_retrying(llm, error):
+    provider = llm(error)
+    with pytest.raises(type(error)):
+        api.call_llm("prompt")
+    assert provider.calls == 1
+
+
+def test_permanent_errors_do_not_open_the_breaker(llm):
+    bad_inputs = [InvalidArgument("400 invalid argument")] * 5
+    provider = llm(*bad_inputs, VALID_RESPONSE)
+    for _ in bad_inputs:
+        with pytest.raises(InvalidArgument):
+            api.call_llm("bad prompt")
+    assert api.llm_circuit_breaker.retry_after() == 0
+    assert api.call_llm("good prompt")["match_score"] == 75
+    assert provider.calls == 6
+
+
+def test_call_llm_rejects_locally_when_rate_limited(llm, monkeypatch):
+    provider = llm(VALID_RESPONSE)
+    monkeypatch.setattr(api, "llm_rate_limiter", TokenBucket(rate=0.5, capacity=0))
+    monkeypatch.setattr(api, "LLM_ACQUIRE_TIMEOUT", 0)
+    with pytest.raises(LLMUnavailableError) as excinfo:
+        api.call_llm("prompt")
+    assert excinfo.value.retry_after == 2
+    assert provider.calls == 0
+    assert api.llm_circuit_breaker.allow()
+
+
+def test_get_llm_analysis_propagates_local_rejections(llm, monkeypatch):
+    llm(VALID_RESPONSE)
+    monkeypatch.setattr(api, "llm_rate_limiter", TokenBucket(rate=1, capacity=0))
+    monkeypatch.setattr(api, "LLM_ACQUIRE_TIMEOUT", 0)
+    with pytest.raises(LLMUnavailableError):
+        api.get_llm_analysis("Python developer resume", "Python developer")
+
+
+# --- Endpoints and jobs ---
+RESUME_PDF = build_pdf([["Python SQL engineer with rate limit coverage"]])
+JOB_DESCRIPTION = "**Key Skills:**\n- Python\n- SQL\n\nRate limit test role"
+
+
+def test_analyze_returns_503_with_retry_after_when_rate_limited(api_client, llm, monkeypatch):
+    llm(VALID_RESPONSE)
+    monkeypatch.setattr(api, "llm_rate_limiter", TokenBucket(rate=0.25, capacity=0))
+    monkeypatch.setattr(api, "LLM_ACQUIRE_TIMEOUT", 0)
+    response = api_client.post('/analyze', data={
+        'resume': (io.BytesIO(RESUME_PDF), 'candidate.pdf'),
+        'job_description': JOB_DESCRIPTION,
+    })
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == "4"
+
+
+def test_process_job_requeues_local_rejections_until_attempts_run_out(api_client, llm, monkeypatch):
+    llm(VALID_RESPONSE)
+    monkeypatch.setattr(api, "llm_rate_limiter", TokenBucket(rate=1, capacity=0))
+    monkeypatch.setattr(api, "LLM_ACQUIRE_TIMEOUT", 0)
+    job = {"filename": "candidate.pdf", "payload": RESUME_PDF, "job_description": JOB_DESCRIPTION, "attempts": 1}
+
+    with pytest.raises(LLMUnavailableError):
+        api.process_job(job)
+
+    result, error = api.process_job({**job, "attempts": api.JOB_MAX_ATTEMPTS})
+    assert result is None
+    assert "temporarily unavailable" in error
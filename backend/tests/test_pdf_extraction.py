@@ -0,0 +1,58 @@
+import io
+import time
+
+import api
+from helpers import build_pdf
+
+PDF = build_pdf([["Python engineer"], ["Second page"]])
+
+
+def test_cache_key_depends_on_extraction_caps(monkeypatch):
+    key = api.pdf_cache_key(PDF)
+    assert key == api.pdf_cache_key(PDF)
+    monkeypatch.setattr(api, "PDF_MAX_CHARS", 10)
+    assert api.pdf_cache_key(PDF) != key
+
+
+def test_changed_caps_re_extract_a_cached_file(api_client, monkeypatch):
+    assert api.extract_text_from_pdf(io.BytesIO(PDF)) == "Python engineer\fSecond page"
+    monkeypatch.setattr(api, "PDF_MAX_PAGES", 1)
+    assert api.extract_text_from_pdf(io.BytesIO(PDF)) == "Python engineer"
+
+
+def test_prune_drops_expired_and_oldest_rows(api_client):
+    db = api.get_db_connection()
+    with db:
+        for i, age in enumerate([10_000, 30, 20, 10]):
+            db.execute(
+                "INSERT INTO pdf_text_cache (file_hash, text, page_count, created_at) VALUES (?, 'text', 1, ?)",
+                (f"h{i}", time.time() - age)
+            )
+        api.prune_pdf_text_cache(db, ttl_seconds=3600, max_entries=2)
+    remaining = [row['file_hash'] for row in db.execute("SELECT file_hash FROM pdf_text_cache ORDER BY file_hash")]
+    db.close()
+    assert remaining == ["h2", "h3"]
+
+
+def test_expired_cached_text_is_ignored(api_client, monkeypatch):
+    api.cache_pdf_text("stale", "old text", 1)
+    assert api.get_cached_pdf_text("stale") == "old text"
+    monkeypatch.setattr(api, "PDF_CACHE_TTL_SECONDS", -1)
+    assert api.get_cached_pdf_text("stale") is None
+
+
+def test_pdf_pool_does_not_fork_and_is_recreated_after_a_fork(monkeypatch):
+    created = []
+
+    class FakeExecutor:
+        def __init__(self, max_workers, mp_context):
+            created.append(mp_context.get_start_method())
+
+    monkeypatch.setattr(api, "ProcessPoolExecutor", FakeExecutor)
+    monkeypatch.setattr(api, "_pdf_pool", None)
+    first = api.get_pdf_pool()
+    assert api.get_pdf_pool() is first
+    monkeypatch.setattr(api, "_pdf_pool_pid", -1)
+    assert api.get_pdf_pool() is not first
+    assert len(created) == 2
+    assert "fork" not in created
@@ -0,0 +1,85 @@
+import io
+
+import api
+from api import extract_job_skills, prescreen_resumes, skill_coverage
+from helpers import build_pdf
+
+REQUIREMENTS_JD = """Senior Backend Engineer
+
+We are looking for an engineer to join our payments platform team.
+
+Requirements:
+- 5+ years of professional Python development
+- Strong experience with PostgreSQL and data modeling
+- Hands-on experience with AWS and infrastructure as code (Terraform)
+- Experience building event-driven systems with Kafka
+- Familiarity with Kubernetes in production
+- Designing and operating REST APIs for payments
+"""
+
+MATCHING_RESUME = """Backend engineer with 7 years of Python.
+Built REST APIs for card payments on PostgreSQL.
+Provisioned AWS/Terraform infrastructure and ran services on Kubernetes.
+Designed event-driven pipelines with Kafka.
+"""
+
+TEMPLATE_JD = "**Role:** Backend Developer\n\n**Key Skills:**\n- Python\n- SQL\n- REST APIs\n- Database Design"
+
+
+def test_requirement_sentences_are_scored_by_their_terms():
+    skills = extract_job_skills(REQUIREMENTS_JD)
+    for term in ("python", "postgresql", "aws", "terraform", "kafka", "kubernetes", "rest", "apis", "payments"):
+        assert term in skills
+    assert not any(" " in skill for skill in skills)
+    assert "5+" not in skills and "years" not in skills
+
+
+def test_matching_resume_scores_high_against_requirements_jd():
+    coverage, matched, missing = skill_coverage(MATCHING_RESUME, extract_job_skills(REQUIREMENTS_JD))
+    assert coverage >= 60
+    assert {"python", "postgresql", "aws", "terraform", "kafka", "kubernetes"} <= set(matched)
+
+
+def test_matching_resume_reaches_the_llm_by_default():
+    [(send_to_llm, heuristic_result)] = prescreen_resumes([MATCHING_RESUME], REQUIREMENTS_JD)
+    assert send_to_llm
+    assert heuristic_result is None
+
+
+def test_short_bullets_stay_skill_phrases():
+    assert extract_job_skills(TEMPLATE_JD) == ["Python", "SQL", "REST APIs", "Database Design"]
+    coverage, matched, missing = skill_coverage("Python and SQL, designed REST APIs", extract_job_skills(TEMPLATE_JD))
+    assert matched == ["Python", "SQL", "REST APIs"]
+    assert missing == ["Database Design"]
+    assert coverage == 75
+
+
+def test_cutoff_only_applies_when_configured():
+    assert api.PRESCREEN_MIN_SCORE == 0
+    [(send_to_llm, heuristic_result)] = prescreen_resumes(["Pastry chef"], TEMPLATE_JD, min_score=10)
+    assert not send_to_llm
+    assert heuristic_result["match_score"] == 0
+
+
+def test_drop_mode_skips_sync_analysis_without_saving(api_client, monkeypatch):
+    monkeypatch.setattr(api, "PRESCREEN_MODE", "drop")
+    below_cutoff = [(False, api.heuristic_analysis(0, [], ["Python"]))]
+    monkeypatch.setattr(api, "prescreen_resumes", lambda texts, job_description, **kwargs: below_cutoff)
+    response = api_client.post('/analyze', data={
+        'resume': (io.BytesIO(build_pdf([["Pastry chef and baker"]])), 'chef.pdf'),
+        'job_description': TEMPLATE_JD,
+    })
+
+    assert response.status_code == 200
+    assert response.json == {"skipped": True, "error": "Below the pre-screening cutoff"}
+    assert api_client.get('/resumes').json['items'] == []
+
+
+def test_batch_rejects_negative_top_k(api_client):
+    response = api_client.post('/analyze/batch', data={
+        'resumes': [(io.BytesIO(build_pdf([[MATCHING_RESUME]])), 'a.pdf')],
+        'job_description': REQUIREMENTS_JD,
+        'top_k': '-1',
+    })
+    assert response.status_code == 400
+    assert api_client.get('/resumes').json['items'] == []
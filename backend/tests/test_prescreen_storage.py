@@ -0,0 +1,48 @@
+import json
+
+import api
+
+LLM_RESULT = {
+    "match_score": 80,
+    "justification": "Strong fit.",
+    "extracted_skills": ["Python"],
+    "extracted_experience": "5 years",
+    "extracted_education": "B.Sc.",
+    "missing_keywords": [],
+}
+
+
+def test_prescreened_results_are_flagged_and_filterable(api_client):
+    heuristic = api.heuristic_analysis(40, ["Python"], ["Go"])
+    api.save_analyses([("llm.pdf", "Python developer", LLM_RESULT), ("quick.pdf", "Python developer", heuristic)])
+
+    rows = api_client.get('/resumes?fields=filename,prescreened').json['items']
+    assert {row['filename']: row['prescreened'] for row in rows} == {"llm.pdf": 0, "quick.pdf": 1}
+
+    llm_only = api_client.get('/resumes?prescreened=false&fields=filename').json['items']
+    assert [row['filename'] for row in llm_only] == ["llm.pdf"]
+    assert api_client.get('/resumes?prescreened=maybe').status_code == 400
+
+
+def test_migration_flags_existing_heuristic_rows(database, monkeypatch):
+    all_migrations = api.SCHEMA_MIGRATIONS
+    monkeypatch.setattr(api, "SCHEMA_MIGRATIONS", all_migrations[:all_migrations.index(api.migrate_add_prescreened_flag)])
+    api.init_db()
+    db = api.get_db_connection()
+    with db:
+        jd_id = api.get_job_description_id(db, "Python developer")
+        for filename, result in (("llm.pdf", LLM_RESULT), ("quick.pdf", api.heuristic_analysis(40, ["Python"], ["Go"]))):
+            db.execute(
+                "INSERT INTO analyses (filename, job_description_id, match_score, justification, extracted_skills, missing_keywords) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (filename, jd_id, result['match_score'], result['justification'],
+                 json.dumps(result['extracted_skills']), json.dumps(result['missing_keywords']))
+            )
+    db.close()
+
+    monkeypatch.setattr(api, "SCHEMA_MIGRATIONS", all_migrations)
+    api.init_db()
+    db = api.get_db_connection()
+    flags = dict(db.execute("SELECT filename, prescreened FROM analyses").fetchall())
+    db.close()
+    assert flags == {"llm.pdf": 0, "quick.pdf": 1}
@@ -0,0 +1,92 @@
+import api
+from api import PAGE_BREAK, compact_resume_text, fit_sections_to_budget, is_page_number, split_sections
+
+REPEATED_ROLES_RESUME = """Jane Doe
+jane@example.com
+
+Experience
+Software Engineer
+Google
+2019
+- Built the ingestion pipeline
+Software Engineer
+Google
+2020
+- Led the search ranking migration
+Software Engineer
+Google
+2021
+- Mentored four new hires
+
+Education
+B.Sc. Computer Science
+2018
+"""
+
+
+def test_text_within_budget_is_only_whitespace_normalized():
+    assert compact_resume_text(REPEATED_ROLES_RESUME) == REPEATED_ROLES_RESUME.strip()
+
+
+def test_repeated_roles_and_years_survive_compaction():
+    padding = "\n\nProjects\n" + "\n".join(f"Side project {i} with a longer description" for i in range(200))
+    compacted = compact_resume_text(REPEATED_ROLES_RESUME + padding, token_budget=200)
+
+    assert compacted.count("Software Engineer") == 3
+    assert compacted.count("Google") == 3
+    for year in ("2019", "2020", "2021", "2018"):
+        assert year in compacted
+    assert compacted.index("2019") < compacted.index("Built the ingestion pipeline") < compacted.index("2020")
+
+
+def test_running_headers_and_page_numbers_are_removed_across_pages():
+    pages = [
+        f"Jane Doe - Resume\n{body}\nPage {number} of 3"
+        for number, body in enumerate(["Summary\n" + "Detail line\n" * 40, "Experience\nEngineer at Acme", "Education\nMIT"], 1)
+    ]
+    compacted = compact_resume_text(PAGE_BREAK.join(pages), token_budget=100)
+
+    assert compacted.count("Jane Doe - Resume") == 1
+    assert "Page" not in compacted
+    assert "Engineer at Acme" in compacted
+    assert "MIT" in compacted
+
+
+def test_page_number_detection():
+    assert is_page_number("Page 3")
+    assert is_page_number("page 2 of 10")
+    assert is_page_number("3 of 10")
+    assert is_page_number("- 4/5 -")
+    assert not is_page_number("2019")
+    assert not is_page_number("2019/2020")
+    assert not is_page_number("12 of 5")
+
+
+def test_fit_sections_keeps_key_sections_and_fills_with_others():
+    sections = split_sections([
+        "Summary", "Motivated engineer " * 10,
+        "Skills", "Python, SQL",
+        "Experience", "Engineer at Acme",
+        "Projects", "Project " * 50,
+    ])
+    kept = fit_sections_to_budget(sections, 220)
+
+    assert "Skills\nPython, SQL" in kept
+    assert "Experience\nEngineer at Acme" in kept
+    assert sum(len(part) for part in kept) <= 220 + len("\n[...]") * len(kept)
+    assert not any(part.startswith("Projects") for part in kept)
+
+
+def test_fit_sections_truncates_key_sections_proportionally():
+    sections = [("skills", "Skills\n" + "Python\n" * 100), ("experience", "Experience\n" + "Role\n" * 100)]
+    kept = fit_sections_to_budget(sections, 200)
+
+    assert len(kept) == 2
+    assert all(part.endswith("[...]") for part in kept)
+    assert all(len(part) <= 120 for part in kept)
+
+
+def test_compacted_prompt_respects_budget():
+    text = "Experience\n" + "\n".join(f"Role {i}: shipped feature {i}" for i in range(500))
+    compacted = compact_resume_text(text, token_budget=100)
+    assert api.estimate_tokens(compacted) <= 110
@@ -0,0 +1,75 @@
+import api
+
+ROWS = [
+    # (filename, match_score, extracted_skills, analysis_date)
+    ("alice.pdf", 90, ["Python"], "2024-03-01 09:00:00"),
+    ("bob.pdf", 40, ["Java"], "2024-03-02 09:00:00"),
+    ("carol_100%.pdf", 75, ["Python", "SQL"], "2024-03-02 09:00:00"),
+    ("dave.pdf", 60, ["Go"], "2024-03-03 09:00:00"),
+    ("erin.pdf", 85, ["Python"], "2024-03-04 09:00:00"),
+]
+
+
+def seed():
+    db = api.get_db_connection()
+    with db:
+        ids = api.insert_analyses(db, [
+            (filename, "Backend developer", {"match_score": score, "extracted_skills": skills})
+            for filename, score, skills, _ in ROWS
+        ])
+        db.executemany("UPDATE analyses SET analysis_date = ? WHERE id = ?",
+                       [(row[3], row_id) for row, row_id in zip(ROWS, ids)])
+    db.close()
+
+
+def fetch_all(client, query):
+    filenames, cursor = [], None
+    while True:
+        url = f"/resumes?{query}" + (f"&cursor={cursor}" if cursor else "")
+        page = client.get(url).json
+        filenames += [item['filename'] for item in page['items']]
+        cursor = page['next_cursor']
+        if not cursor:
+            return filenames
+
+
+def test_cursor_walks_every_row_once_newest_first(api_client):
+    seed()
+    # bob and carol share a timestamp, so the id tie-breaker decides their order
+    assert fetch_all(api_client, "limit=2") == ["erin.pdf", "dave.pdf", "carol_100%.pdf", "bob.pdf", "alice.pdf"]
+    assert api_client.get('/resumes?limit=5').json['next_cursor'] is None
+
+
+def test_filters_combine_with_pagination(api_client):
+    seed()
+    assert fetch_all(api_client, "limit=1&min_score=60&max_score=85") == ["erin.pdf", "dave.pdf", "carol_100%.pdf"]
+    assert fetch_all(api_client, "since=2024-03-02&until=2024-03-03") == ["carol_100%.pdf", "bob.pdf"]
+    assert fetch_all(api_client, "skill=python&limit=1") == ["erin.pdf", "carol_100%.pdf", "alice.pdf"]
+    # LIKE wildcards in the filename filter are matched literally
+    assert fetch_all(api_client, "filename=100%25") == ["carol_100%.pdf"]
+    assert fetch_all(api_client, "filename=_") == ["carol_100%.pdf"]
+
+
+def test_fields_project_columns_and_job_descriptions(api_client):
+    seed()
+    page = api_client.get('/resumes?fields=filename,match_score&limit=1').json
+    assert page['items'] == [{"id": 5, "analysis_date": "2024-03-04 09:00:00", "filename": "erin.pdf", "match_score": 85}]
+    assert 'job_descriptions' not in page
+
+    page = api_client.get('/resumes?fields=filename,job_description&limit=1').json
+    jd_id = page['items'][0]['job_description_id']
+    assert page['job_descriptions'] == {str(jd_id): "Backend developer"}
+
+
+def test_invalid_queries_are_rejected(api_client):
+    for query in ("limit=0", "limit=abc", "min_score=high", "fields=password", "cursor=not-a-cursor"):
+        assert api_client.get(f'/resumes?{query}').status_code == 400, query
+
+
+def test_listing_uses_the_date_index(api_client):
+    db = api.get_db_connection()
+    plan = " ".join(row['detail'] for row in db.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM analyses ORDER BY analysis_date DESC, id DESC LIMIT 10"
+    ))
+    db.close()
+    assert "idx_analyses_date" in plan
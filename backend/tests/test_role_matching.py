@@ -0,0 +1,62 @@
+import io
+import json
+
+import pytest
+
+import api
+from helpers import build_pdf
+
+RESUME_PDF = build_pdf([["Python SQL Flask Docker engineer"]])
+ROLES = [
+    {"title": title, "description": "**Key Skills:**\n- Python\n- SQL\n- Flask\n- Docker"}
+    for title in ("Backend", "Platform", "Data", "API")
+]
+# Identical descriptions would share one job description row; make each unique
+for i, role in enumerate(ROLES):
+    role["description"] += f"\n\n**Team:** {i}"
+
+
+def match_roles(client, top_k):
+    return client.post('/analyze/roles', data={
+        'resume': (io.BytesIO(RESUME_PDF), 'candidate.pdf'),
+        'roles': json.dumps(ROLES),
+        'top_k': str(top_k),
+    })
+
+
+def test_llm_scored_roles_rank_above_prescreened_ones(api_client):
+    response = match_roles(api_client, top_k=1)
+    assert response.status_code == 200
+    roles = response.json['roles']
+
+    assert [role['prescreened'] for role in roles] == [False, True, True, True]
+    assert 'match_score' in roles[0]['analysis']
+    for role in roles[1:]:
+        assert role['skill_coverage'] == 100
+        assert 'match_score' not in role['analysis']
+
+    stored = api_client.get(f"/matches/{response.json['match_run_id']}").json['roles']
+    assert [row['prescreened'] for row in stored] == [0, 1, 1, 1]
+
+
+def test_failed_save_leaves_no_empty_match_run(api_client, monkeypatch):
+
+    def failing_insert(db, records, match_run_id=None):
+        raise RuntimeError("disk full")
+    monkeypatch.setattr(api, "insert_analyses", failing_insert)
+
+    with pytest.raises(RuntimeError):
+        api.save_match_run("candidate.pdf", [("candidate.pdf", "Python developer", {})])
+    db = api.get_db_connection()
+    assert db.execute("SELECT COUNT(*) FROM match_runs").fetchone()[0] == 0
+    db.close()
+
+    response = match_roles(api_client, top_k=1)
+    assert response.status_code == 200
+    assert response.json['match_run_id'] is None
+
+
+def test_negative_top_k_is_rejected(api_client):
+    response = match_roles(api_client, top_k=-1)
+    assert response.status_code == 400
+    assert api_client.get('/resumes').json['items'] == []
@@ -0,0 +1,90 @@
+import json
+import sqlite3
+
+import api
+
+BACKEND_JD = "Backend developer: Python, SQL"
+DATA_JD = "Data engineer: Spark, Airflow"
+
+# (id, filename, job_description, match_score, extracted_skills, analysis_date)
+BASELINE_ROWS = [
+    (3, "alice.pdf", BACKEND_JD, 82, ["Python", "SQL"], "2024-01-01 09:00:00"),
+    (7, "bob.pdf", DATA_JD, 64, ["Spark"], "2024-01-02 09:00:00"),
+    (9, "carol.pdf", BACKEND_JD, 71, ["Python", "Go"], "2024-01-03 09:00:00"),
+]
+
+
+def create_baseline_database(path):
+    """The single-table schema the app shipped with before migrations existed."""
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE analyses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            filename TEXT NOT NULL,
+            job_description TEXT NOT NULL,
+            match_score INTEGER NOT NULL,
+            justification TEXT,
+            extracted_skills TEXT,
+            extracted_experience TEXT,
+            extracted_education TEXT,
+            missing_keywords TEXT,
+            analysis_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    ''')
+    conn.executemany(
+        "INSERT INTO analyses (id, filename, job_description, match_score, justification, extracted_skills, "
+        "extracted_experience, extracted_education, missing_keywords, analysis_date) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [(row_id, filename, jd, score, f"Knows {skills[0]}", json.dumps(skills), "5 years", "B.Sc.", "[]", date)
+         for row_id, filename, jd, score, skills, date in BASELINE_ROWS]
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_baseline_database_is_migrated_without_losing_rows(database):
+    create_baseline_database(database)
+    api.init_db()
+
+    db = api.get_db_connection()
+    assert db.execute("PRAGMA user_version").fetchone()[0] == len(api.SCHEMA_MIGRATIONS)
+    rows = db.execute(
+        "SELECT a.id, a.filename, jd.text, a.match_score, a.analysis_date FROM analyses a "
+        "JOIN job_descriptions jd ON jd.id = a.job_description_id ORDER BY a.id"
+    ).fetchall()
+    assert [tuple(row) for row in rows] == [
+        (row_id, filename, jd, score, date) for row_id, filename, jd, score, _, date in BASELINE_ROWS
+    ]
+    assert db.execute("SELECT COUNT(*) FROM job_descriptions").fetchone()[0] == 2
+    columns = {row['name'] for row in db.execute("PRAGMA table_info(analyses)")}
+    assert 'job_description' not in columns
+
+    skills = db.execute(
+        "SELECT analysis_id, skill FROM analysis_skills WHERE kind = 'extracted' ORDER BY analysis_id, skill"
+    ).fetchall()
+    assert [tuple(row) for row in skills] == [(3, "python"), (3, "sql"), (7, "spark"), (9, "go"), (9, "python")]
+    if api.FTS5_AVAILABLE:
+        matches = db.execute("SELECT rowid FROM analyses_fts WHERE analyses_fts MATCH 'spark'").fetchall()
+        assert [row[0] for row in matches] == [7]
+
+    # New rows continue after the migrated ids and reuse the deduplicated description
+    with db:
+        [new_id] = api.insert_analyses(db, [("dave.pdf", BACKEND_JD, {"match_score": 50, "extracted_skills": ["SQL"]})])
+    assert new_id > 9
+    assert db.execute("SELECT COUNT(*) FROM job_descriptions").fetchone()[0] == 2
+    db.close()
+
+
+def test_migrated_rows_are_served_and_searchable(database):
+    create_baseline_database(database)
+    client = api.app.test_client()
+
+    page = client.get('/resumes').json
+    assert [item['id'] for item in page['items']] == [9, 7, 3]
+    assert page['job_descriptions'] == {
+        str(page['items'][0]['job_description_id']): BACKEND_JD,
+        str(page['items'][1]['job_description_id']): DATA_JD,
+    }
+    assert page['items'][0]['job_description_id'] == page['items'][2]['job_description_id']
+
+    found = client.get('/search?skills=python').json
+    assert sorted(item['id'] for item in found['items']) == [3, 9]
@@ -0,0 +1,35 @@
+import io
+import json
+
+from helpers import build_pdf
+
+RESUME_PDF = build_pdf([["Python SQL engineer"]])
+JD = "**Key Skills:**\n- Python\n- SQL"
+
+
+def stages(response):
+    return {entry.split(';')[0] for entry in response.headers['Server-Timing'].split(', ')}
+
+
+def test_batch_reports_stages_from_worker_threads(api_client):
+    response = api_client.post('/analyze/batch', data={
+        'job_description': JD,
+        'resumes': [(io.BytesIO(RESUME_PDF), 'a.pdf'), (io.BytesIO(RESUME_PDF), 'b.pdf')],
+    })
+    assert response.status_code == 200
+    assert {"pdf_extract", "llm", "db_write", "total"} <= stages(response)
+
+
+def test_roles_report_llm_stage_from_worker_threads(api_client):
+    response = api_client.post('/analyze/roles', data={
+        'resume': (io.BytesIO(RESUME_PDF), 'candidate.pdf'),
+        # A description the batch test has not analyzed, so the LLM is not served from the cache
+        'roles': json.dumps([{"title": "Backend", "description": JD + "\n- Flask"}]),
+    })
+    assert response.status_code == 200
+    assert {"llm", "total"} <= stages(response)
+
+
+def test_timings_do_not_leak_between_requests(api_client):
+    api_client.post('/analyze/batch', data={'job_description': JD, 'resumes': [(io.BytesIO(RESUME_PDF), 'a.pdf')]})
+    assert stages(api_client.get('/resumes')) == {"total"}
@@ -0,0 +1,60 @@
+import csv
+import gzip
+import io
+import json
+
+import api
+
+RESULT = {
+    "match_score": 70,
+    "justification": "Solid, with caveats.",
+    "extracted_skills": ["Python", "Go"],
+    "extracted_experience": "4 years",
+    "extracted_education": "B.Sc.",
+    "missing_keywords": ["Rust"],
+}
+
+
+def seed(count):
+    api.save_analyses([(f"r{i}.pdf", "Backend developer", RESULT) for i in range(count)])
+
+
+def test_sync_returns_only_new_rows_in_pages(api_client):
+    seed(5)
+    first = api_client.get('/resumes/sync?limit=3&fields=filename').json
+    assert [row['id'] for row in first['items']] == [1, 2, 3]
+    assert first['has_more']
+
+    second = api_client.get(f"/resumes/sync?since_id={first['last_id']}&limit=3").json
+    assert [row['id'] for row in second['items']] == [4, 5]
+    assert not second['has_more']
+    assert json.loads(second['items'][0]['extracted_skills']) == ["Python", "Go"]
+
+    seed(1)
+    third = api_client.get(f"/resumes/sync?since_id={second['last_id']}").json
+    assert [row['id'] for row in third['items']] == [6]
+
+
+def test_csv_export_has_one_column_per_analysis_field(api_client):
+    seed(3)
+    response = api_client.get('/export?format=csv')
+    assert response.mimetype == 'application/gzip'
+
+    rows = list(csv.reader(io.StringIO(gzip.decompress(response.data).decode('utf-8'))))
+    assert tuple(rows[0]) == api.ANALYSIS_COLUMNS
+    assert len(rows) == 4
+    record = dict(zip(rows[0], rows[1]))
+    assert record['extracted_skills'] == "Python; Go"
+    assert record['justification'] == RESULT['justification']
+
+
+def test_columnar_export_explodes_skills_in_chunks(api_client, monkeypatch):
+    seed(3)
+    monkeypatch.setattr(api, "EXPORT_CHUNK_ROWS", 4)
+    response = api_client.get('/export?format=columnar&explode=skills&since_id=1')
+
+    chunks = [json.loads(line) for line in gzip.decompress(response.data).decode('utf-8').splitlines()]
+    assert [chunk['rows'] for chunk in chunks] == [4, 2]
+    skills = [skill for chunk in chunks for skill in chunk['data']['skill']]
+    assert sorted(skills) == sorted(["python", "go", "rust"] * 2)
+    assert api_client.get('/export?format=parquet').status_code == 400